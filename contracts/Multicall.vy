@@ -0,0 +1,46 @@
+# @version 0.3.9
+
+# @dev Maximum number of calls aggregated in one request.
+MAX_CALLS: constant(uint256) = 128
+# @dev Maximum calldata per call: a selector and eight arguments.
+MAX_CALLDATA: constant(uint256) = 260
+# @dev Maximum return data per call; longer results are reported as failed.
+MAX_RETURNDATA: constant(uint256) = 1024
+# @dev One byte more than is kept, to tell a full result from a truncated one.
+MAX_OUTSIZE: constant(uint256) = MAX_RETURNDATA + 1
+
+struct Call:
+    target: address
+    callData: Bytes[MAX_CALLDATA]
+
+struct Result:
+    success: bool
+    returnData: Bytes[MAX_OUTSIZE]
+
+@view
+@external
+def aggregate(calls: DynArray[Call, MAX_CALLS]) -> (uint256, DynArray[Result, MAX_CALLS]):
+    """
+    @dev Perform several static calls and return their results along with the
+         block number they were read at. A failing call does not revert the
+         batch; its result has `success` set to False. So does a call that
+         returns more than MAX_RETURNDATA bytes, which cannot be kept whole.
+    @param calls The target and ABI encoded calldata of each call.
+    @return The current block number and one result per call, in order.
+    """
+    results: DynArray[Result, MAX_CALLS] = []
+    for c in calls:
+        success: bool = False
+        response: Bytes[MAX_OUTSIZE] = b""
+        success, response = raw_call(
+            c.target,
+            c.callData,
+            max_outsize=MAX_OUTSIZE,
+            is_static_call=True,
+            revert_on_failure=False
+        )
+        if len(response) > MAX_RETURNDATA:
+            success = False
+            response = b""
+        results.append(Result({success: success, returnData: response}))
+    return block.number, results
@@ -125,6 +125,8 @@ SYMBOL: constant(String[5]) = "APES"
 baseURI: public(String[100])
 # @dev Maximum supply of token
 MAX_SUPPLY: constant(uint256) = 10000
+# @dev Maximum number of tokens minted or transferred in one batch call
+MAX_BATCH: constant(uint256) = 500
 # @dev Percentage of royalties for lifetime for the creator
 ROYALTY_TO_APPLY_TO_PRICE: constant(decimal) = 10.0 / 100.0
 
@@ -346,6 +348,30 @@ def safeTransferFrom(
         assert returnValue == method_id("onERC721Received(address,address,uint256,bytes)", output_type=bytes4)
 
 
+@external
+def safeTransferFromBatch(
+        owner: address,
+        receiver: address,
+        tokenIds: DynArray[uint256, MAX_BATCH],
+        data: Bytes[1024]=b""
+    ):
+    """
+    @dev Transfers several NFTs from one address to another address. Each token is
+         checked and transferred as in `safeTransferFrom`, emitting one Transfer each.
+    @param owner The current owner of the NFTs.
+    @param receiver The new owner.
+    @param tokenIds The NFTs to transfer.
+    @param data Additional data with no specified format, sent in each call to `receiver`.
+    """
+    isContract: bool = receiver.is_contract
+    for tokenId in tokenIds:
+        self._transferFrom(owner, receiver, tokenId, msg.sender)
+        if isContract:
+            returnValue: bytes4 = ERC721Receiver(receiver).onERC721Received(msg.sender, owner, tokenId, data)
+            # Throws if transfer destination is a contract which does not implement 'onERC721Received'
+            assert returnValue == method_id("onERC721Received(address,address,uint256,bytes)", output_type=bytes4)
+
+
 @external
 def approve(operator: address, tokenId: uint256):
     """
@@ -468,4 +494,34 @@ def mint(receiver: address) -> bool:
 
     log Transfer(empty(address), receiver, nftId)
 
-    return True
\ No newline at end of file
+    return True
+
+@external
+def mintBatch(receiver: address, count: uint256) -> bool:
+    """
+    @dev Create `count` new Owner NFTs with consecutive IDs starting at `totalSupply`.
+         `balanceOf` and `totalSupply` are written once for the whole batch.
+    @return bool confirming that the minting occurred
+    """
+    # Throws if `msg.sender` is not the minter
+    assert msg.sender == self.owner or self.isMinter[msg.sender], "Access is denied."
+    # Throws if `receiver` is zero address
+    assert receiver != empty(address)
+    assert count > 0 and count <= MAX_BATCH
+
+    firstId: uint256 = self.totalSupply
+    assert firstId + count <= MAX_SUPPLY
+
+    for i in range(MAX_BATCH):
+        if i == count:
+            break
+        nftId: uint256 = firstId + i
+        # Throws if the ID is already owned by someone
+        assert self.idToOwner[nftId] == empty(address)
+        self.idToOwner[nftId] = receiver
+        log Transfer(empty(address), receiver, nftId)
+
+    self.totalSupply = firstId + count
+    self.balanceOf[receiver] += count
+
+    return True
@@ -55,6 +55,59 @@ struct PawnData:
     borrower: address
     lender: address
 
+# @dev Storage layout of a pawn. The state, start timestamp and duration share
+#      the `timing` slot so that state transitions only rewrite the slots that
+#      change. See `_packTiming` for the bit layout.
+struct PawnRecord:
+    nftVault: address
+    nftId: uint256
+    currency: address
+    principal: uint256
+    interest: uint256
+    borrower: address
+    lender: address
+    timing: uint256
+
+# @dev A pawn as returned by the paginated views. `amountDue` is zero when the
+#      pawn is not currently repayable.
+struct PawnEntry:
+    pawnId: uint256
+    data: PawnData
+    amountDue: uint256
+    inDefault: bool
+
+# @dev One NFT of a multi-NFT pawn.
+struct BundleItem:
+    nftVault: address
+    nftId: uint256
+
+# @dev A lender's signed offer to fund a loan against one NFT. The NFT's owner
+#      takes it with `fillLendOffer`. `salt` lets a lender sign several
+#      otherwise identical offers.
+struct LendOffer:
+    lender: address
+    nftVault: address
+    nftId: uint256
+    currency: address
+    principal: uint256
+    interest: uint256
+    durationInSeconds: uint256
+    salt: uint256
+    deadline: uint256
+
+# @dev A lender's signed offer to fund up to `maxFills` loans, each against any
+#      one NFT from `nftVault`. Taken with `fillCollectionOffer`.
+struct CollectionOffer:
+    lender: address
+    nftVault: address
+    currency: address
+    principal: uint256
+    interest: uint256
+    durationInSeconds: uint256
+    maxFills: uint256
+    salt: uint256
+    deadline: uint256
+
 
 # @dev This emits when an NFT is listed as collateral for a loan.
 # @param pawnId ID of the pawn data.
@@ -83,16 +136,115 @@ event PawnRepaid:
 event PawnDefaultClaimed:
     pawnId: indexed(uint256)
 
+# @dev This emits instead of keeping the record when a pawn is repaid or
+# claimed while `reclaimStorage` is on, with the pawn's final data.
+# @param pawnId ID of the cleared pawn data.
+# @param state Final PawnState, REPAID or DEFAULTED.
+# @param bundleVaults, bundleIds NFTs of the bundle beyond `nftId`.
+event PawnArchived:
+    pawnId: indexed(uint256)
+    borrower: indexed(address)
+    lender: indexed(address)
+    state: uint256
+    nftVault: address
+    nftId: uint256
+    currency: address
+    principal: uint256
+    interest: uint256
+    durationInSeconds: uint256
+    startTimestamp: uint256
+    bundleVaults: DynArray[address, MAX_BUNDLE_EXTRA]
+    bundleIds: DynArray[uint256, MAX_BUNDLE_EXTRA]
+
+# @dev This emits when an active loan moves to a new lender and terms, with
+# the old lender paid off and the NFT kept in escrow.
+# @param pawnId ID of the pawn data.
+# @param oldLender Lender that was paid off.
+# @param newLender Lender funding the loan from now on.
+event PawnRefinanced:
+    pawnId: indexed(uint256)
+    oldLender: indexed(address)
+    newLender: indexed(address)
+
+# @dev This emits when a borrower takes a lender's signed offer. A collection
+# offer emits it once per fill.
+# @param offerHash EIP-712 hash of the offer.
+# @param pawnId ID of the pawn started by the fill.
+event LendOfferFilled:
+    offerHash: indexed(bytes32)
+    pawnId: indexed(uint256)
+
+# @dev This emits when a lender withdraws a signed offer.
+# @param offerHash EIP-712 hash of the offer.
+# @param lender Lender that signed the offer.
+event LendOfferCanceled:
+    offerHash: indexed(bytes32)
+    lender: indexed(address)
+
 owner: public(address)
 
-# @dev pawnId => PawnData
-idToData: public(HashMap[uint256, PawnData])
+# @dev When set, repaid and defaulted pawns are cleared from storage and only
+#      kept in their PawnArchived log.
+reclaimStorage: public(bool)
+
+# @dev pawnId => PawnRecord, exposed as PawnData through `idToData`
+pawns: HashMap[uint256, PawnRecord]
+
+# @dev borrower => number of pawns listed by the borrower
+borrowerPawnCount: public(HashMap[address, uint256])
+# @dev borrower => index => pawnId
+borrowerPawnByIndex: public(HashMap[address, HashMap[uint256, uint256]])
 
-nextPawnId: uint256
+# @dev lender => number of pawns funded by the lender
+lenderPawnCount: public(HashMap[address, uint256])
+# @dev lender => index => pawnId
+lenderPawnByIndex: public(HashMap[address, HashMap[uint256, uint256]])
+
+# @dev Unordered set of ACTIVE pawns. Removal swaps the last entry into the
+#      removed slot.
+activePawnCount: public(uint256)
+# @dev index => pawnId
+activePawnByIndex: public(HashMap[uint256, uint256])
+# @dev pawnId => index in the active set plus one, zero when not active
+activePawnPosition: HashMap[uint256, uint256]
+
+nextPawnId: public(uint256)
+
+# @dev pawnId => NFTs pledged beyond the one in the pawn's record. Empty for
+#      single-NFT pawns.
+bundles: HashMap[uint256, DynArray[BundleItem, MAX_BUNDLE_EXTRA]]
+
+DOMAIN_SEPARATOR: public(bytes32)
+
+# @dev offer hash => number of times a lend or collection offer was filled,
+#      max_value(uint256) once canceled
+offerFills: public(HashMap[bytes32, uint256])
 
 ERC165_ID_OF_ERC721: constant(bytes4) = 0x80ac58cd
 ERC165_ID_OF_ERC721Permit: constant(bytes4) = 0x5604e225
 
+DOMAIN_TYPE_HASH: constant(bytes32) = keccak256('EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)')
+LEND_OFFER_TYPE_HASH: constant(bytes32) = keccak256('LendOffer(address lender,address nftVault,uint256 nftId,address currency,uint256 principal,uint256 interest,uint256 durationInSeconds,uint256 salt,uint256 deadline)')
+COLLECTION_OFFER_TYPE_HASH: constant(bytes32) = keccak256('CollectionOffer(address lender,address nftVault,address currency,uint256 principal,uint256 interest,uint256 durationInSeconds,uint256 maxFills,uint256 salt,uint256 deadline)')
+
+# @dev Maximum number of pawns that can be listed in a single batch.
+MAX_BATCH_SIZE: constant(uint256) = 200
+
+# @dev Maximum number of NFTs pledged by one pawn, and the number stored
+#      outside the pawn's record.
+MAX_BUNDLE_SIZE: constant(uint256) = 16
+MAX_BUNDLE_EXTRA: constant(uint256) = 15
+
+# @dev Bit layout of PawnRecord.timing:
+#      [0, 8) state, [8, 72) startTimestamp, [72, 136) durationInSeconds
+STATE_MASK: constant(uint256) = 255
+UINT64_MASK: constant(uint256) = 18446744073709551615
+START_SHIFT: constant(uint256) = 8
+DURATION_SHIFT: constant(uint256) = 72
+
+# @dev Maximum number of pawns returned by a paginated view.
+MAX_PAGE_SIZE: constant(uint256) = 100
+
 @external
 def __init__():
     """
@@ -100,42 +252,200 @@ def __init__():
     """
     self.owner = msg.sender
     self.nextPawnId = 1
+    self.DOMAIN_SEPARATOR = keccak256(
+        concat(
+            DOMAIN_TYPE_HASH,
+            keccak256("NiftyPawn"),
+            keccak256("1.0"),
+            _abi_encode(chain.id, self)
+        )
+    )
+
+@pure
+@internal
+def _packTiming(state: PawnState, startTimestamp: uint256, durationInSeconds: uint256) -> uint256:
+    return convert(state, uint256) | (startTimestamp << START_SHIFT) | (durationInSeconds << DURATION_SHIFT)
+
+@pure
+@internal
+def _stateOf(timing: uint256) -> PawnState:
+    return convert(timing & STATE_MASK, PawnState)
 
 @view
 @internal
-def _isPawnInState(pawnId: uint256, state: PawnState) -> bool:
-    return self.idToData[pawnId].state == state
+def _pawnData(pawnId: uint256) -> PawnData:
+    record: PawnRecord = self.pawns[pawnId]
+    return PawnData({
+        terms: PawnTerms({
+            nftVault: record.nftVault,
+            nftId: record.nftId,
+            currency: record.currency,
+            principal: record.principal,
+            interest: record.interest,
+            durationInSeconds: (record.timing >> DURATION_SHIFT) & UINT64_MASK
+        }),
+        state: self._stateOf(record.timing),
+        startTimestamp: (record.timing >> START_SHIFT) & UINT64_MASK,
+        borrower: record.borrower,
+        lender: record.lender
+    })
+
+@internal
+def _addBorrowerPawn(borrower: address, pawnId: uint256):
+    count: uint256 = self.borrowerPawnCount[borrower]
+    self.borrowerPawnByIndex[borrower][count] = pawnId
+    self.borrowerPawnCount[borrower] = count + 1
+
+@internal
+def _addLenderPawn(lender: address, pawnId: uint256):
+    count: uint256 = self.lenderPawnCount[lender]
+    self.lenderPawnByIndex[lender][count] = pawnId
+    self.lenderPawnCount[lender] = count + 1
+
+@internal
+def _addActivePawn(pawnId: uint256):
+    count: uint256 = self.activePawnCount
+    self.activePawnByIndex[count] = pawnId
+    self.activePawnPosition[pawnId] = count + 1
+    self.activePawnCount = count + 1
+
+@internal
+def _removeActivePawn(pawnId: uint256):
+    index: uint256 = self.activePawnPosition[pawnId] - 1
+    lastIndex: uint256 = self.activePawnCount - 1
+    if index != lastIndex:
+        lastPawnId: uint256 = self.activePawnByIndex[lastIndex]
+        self.activePawnByIndex[index] = lastPawnId
+        self.activePawnPosition[lastPawnId] = index + 1
+    self.activePawnByIndex[lastIndex] = 0
+    self.activePawnPosition[pawnId] = 0
+    self.activePawnCount = lastIndex
 
 @view
 @internal
-def _pawnInDefault(pawnId: uint256) -> bool:
-    data: PawnData = self.idToData[pawnId]
-    return self._isPawnInState(pawnId, PawnState.ACTIVE) and block.timestamp >= (data.startTimestamp + data.terms.durationInSeconds)
+def _pawnInDefault(data: PawnData) -> bool:
+    return data.state == PawnState.ACTIVE and block.timestamp >= (data.startTimestamp + data.terms.durationInSeconds)
 
 @view
 @internal
-def _pawnIsRepayable(pawnId: uint256) -> bool:
-    data: PawnData = self.idToData[pawnId]
-    return self._isPawnInState(pawnId, PawnState.ACTIVE) and block.timestamp < (data.startTimestamp + data.terms.durationInSeconds)
+def _pawnIsRepayable(data: PawnData) -> bool:
+    return data.state == PawnState.ACTIVE and block.timestamp < (data.startTimestamp + data.terms.durationInSeconds)
 
 @view
 @internal
-def _amountDue(pawnId: uint256) -> uint256:
-    assert self._pawnIsRepayable(pawnId)
-    data: PawnData = self.idToData[pawnId]
+def _amountDue(data: PawnData) -> uint256:
+    assert self._pawnIsRepayable(data)
     return data.terms.principal + data.terms.interest
 
+@view
+@internal
+def _pawnEntry(pawnId: uint256) -> PawnEntry:
+    data: PawnData = self._pawnData(pawnId)
+    due: uint256 = 0
+    if self._pawnIsRepayable(data):
+        due = data.terms.principal + data.terms.interest
+    return PawnEntry({
+        pawnId: pawnId,
+        data: data,
+        amountDue: due,
+        inDefault: self._pawnInDefault(data)
+    })
+
+@view
+@external
+def idToData(pawnId: uint256) -> PawnData:
+    return self._pawnData(pawnId)
+
+@view
+@external
+def getPawns(startId: uint256, count: uint256) -> DynArray[PawnEntry, MAX_PAGE_SIZE]:
+    """
+    @dev Read up to `count` consecutive pawns starting at `startId`, stopping
+         at `nextPawnId`. Canceled and archived pawns are returned with empty
+         data.
+    """
+    last: uint256 = self.nextPawnId
+    entries: DynArray[PawnEntry, MAX_PAGE_SIZE] = []
+    for i in range(MAX_PAGE_SIZE):
+        if i == count or startId + i >= last:
+            break
+        entries.append(self._pawnEntry(startId + i))
+    return entries
+
+@view
+@external
+def pawnsOfBorrower(borrower: address, start: uint256, count: uint256) -> DynArray[PawnEntry, MAX_PAGE_SIZE]:
+    """
+    @dev Page through the pawns listed by `borrower`, oldest first. Canceled
+         and archived pawns keep their slot and are returned with empty data.
+    """
+    total: uint256 = self.borrowerPawnCount[borrower]
+    entries: DynArray[PawnEntry, MAX_PAGE_SIZE] = []
+    for i in range(MAX_PAGE_SIZE):
+        if i == count or start + i >= total:
+            break
+        entries.append(self._pawnEntry(self.borrowerPawnByIndex[borrower][start + i]))
+    return entries
+
+@view
+@external
+def pawnsOfLender(lender: address, start: uint256, count: uint256) -> DynArray[PawnEntry, MAX_PAGE_SIZE]:
+    """
+    @dev Page through the pawns funded by `lender`, oldest first. A pawn
+         refinanced onto another lender stays listed here; its entry's
+         `data.lender` is the lender that funds it now.
+    """
+    total: uint256 = self.lenderPawnCount[lender]
+    entries: DynArray[PawnEntry, MAX_PAGE_SIZE] = []
+    for i in range(MAX_PAGE_SIZE):
+        if i == count or start + i >= total:
+            break
+        entries.append(self._pawnEntry(self.lenderPawnByIndex[lender][start + i]))
+    return entries
+
+@view
+@external
+def activePawns(start: uint256, count: uint256) -> DynArray[PawnEntry, MAX_PAGE_SIZE]:
+    """
+    @dev Page through the currently ACTIVE pawns. The set is unordered and
+         entries move when another pawn leaves it.
+    """
+    total: uint256 = self.activePawnCount
+    entries: DynArray[PawnEntry, MAX_PAGE_SIZE] = []
+    for i in range(MAX_PAGE_SIZE):
+        if i == count or start + i >= total:
+            break
+        entries.append(self._pawnEntry(self.activePawnByIndex[start + i]))
+    return entries
+
 @view
 @external
 def stateOf(pawnId: uint256) -> PawnState:
-    data: PawnData = self.idToData[pawnId]
-    assert data.state != empty(PawnState)
-    return data.state
+    state: PawnState = self._stateOf(self.pawns[pawnId].timing)
+    assert state != empty(PawnState)
+    return state
 
 @view
 @external
 def amountDue(pawnId: uint256) -> uint256:
-    return self._amountDue(pawnId)
+    return self._amountDue(self._pawnData(pawnId))
+
+@view
+@external
+def bundleOf(pawnId: uint256) -> DynArray[BundleItem, MAX_BUNDLE_SIZE]:
+    """
+    @dev Every NFT pledged by a pawn, starting with the one in its terms.
+         Empty for canceled or unknown pawns.
+    """
+    items: DynArray[BundleItem, MAX_BUNDLE_SIZE] = []
+    record: PawnRecord = self.pawns[pawnId]
+    if record.nftVault == empty(address):
+        return items
+    items.append(BundleItem({nftVault: record.nftVault, nftId: record.nftId}))
+    bundle: DynArray[BundleItem, MAX_BUNDLE_EXTRA] = self.bundles[pawnId]
+    for item in bundle:
+        items.append(item)
+    return items
 
 @pure
 @external
@@ -143,60 +453,130 @@ def onERC721Received(operator: address, owner: address, tokenId: uint256, data:
     return method_id("onERC721Received(address,address,uint256,bytes)", output_type=bytes4)
 
 @internal
-def _defaultPawn(pawnId: uint256, lender: address):
-    assert self._pawnInDefault(pawnId)
+def _defaultPawn(pawnId: uint256, data: PawnData, lender: address):
+    assert self._pawnInDefault(data)
 
-    data: PawnData = self.idToData[pawnId]
-    self.idToData[pawnId].state = PawnState.DEFAULTED
+    self._endPawn(pawnId, data, PawnState.DEFAULTED)
     ERC721(data.terms.nftVault).safeTransferFrom(
         self,
         lender,
         data.terms.nftId,
         b""
     )
+    self._releaseBundle(pawnId, lender, self.reclaimStorage)
 
     log PawnDefaultClaimed(pawnId)
 
 @external
 def claimDefaulted(pawnId: uint256) -> bool:
-    assert msg.sender == self.idToData[pawnId].lender
-    self._defaultPawn(pawnId, msg.sender)
+    data: PawnData = self._pawnData(pawnId)
+    assert msg.sender == data.lender
+    self._defaultPawn(pawnId, data, msg.sender)
     return True
 
 @external
-def repay(pawnId: uint256, permitDeadline: uint256, permitSignature: Bytes[65]) -> bool:
-    assert self._pawnIsRepayable(pawnId)
-    due: uint256 = self._amountDue(pawnId)
+def claimDefaultedBatch(pawnIds: DynArray[uint256, MAX_BATCH_SIZE]) -> bool:
+    """
+    @dev Claim the collateral of several defaulted pawns funded by the sender.
+    """
+    for pawnId in pawnIds:
+        data: PawnData = self._pawnData(pawnId)
+        assert msg.sender == data.lender
+        self._defaultPawn(pawnId, data, msg.sender)
+    return True
 
-    data: PawnData = self.idToData[pawnId]
+@internal
+def _permitCurrency(currency: address, owner: address, amount: uint256, permitDeadline: uint256, permitSignature: Bytes[65]):
+    # An empty signature skips the permit and relies on the allowance the
+    # owner has already granted this contract.
+    if len(permitSignature) > 0:
+        assert ERC20Permit(currency).permit(owner, self, amount, permitDeadline, permitSignature)
+
+@external
+def repay(pawnId: uint256, permitDeadline: uint256, permitSignature: Bytes[65]) -> bool:
+    data: PawnData = self._pawnData(pawnId)
+    due: uint256 = self._amountDue(data)
 
     assert ERC20(data.terms.currency).balanceOf(msg.sender) >= due
 
-    self.idToData[pawnId].state = PawnState.REPAID
+    self._endPawn(pawnId, data, PawnState.REPAID)
 
-    assert ERC20Permit(data.terms.currency).permit(msg.sender, self, due, permitDeadline, permitSignature)
+    self._permitCurrency(data.terms.currency, msg.sender, due, permitDeadline, permitSignature)
     assert ERC20(data.terms.currency).transferFrom(msg.sender, data.lender, due)
     ERC721(data.terms.nftVault).safeTransferFrom(self, data.borrower, data.terms.nftId, b"")
+    self._releaseBundle(pawnId, data.borrower, self.reclaimStorage)
 
     log PawnRepaid(pawnId)
 
     return True
 
+@external
+def repayBatch(pawnIds: DynArray[uint256, MAX_BATCH_SIZE], permitDeadline: uint256, permitSignature: Bytes[65]) -> bool:
+    """
+    @dev Repay several pawns in the same currency with a single permit for the
+         combined amount due. Amounts owed to the same lender are paid in one
+         transfer. Each pawn's collateral goes back to its borrower.
+    @param pawnIds The pawns to repay; all must share one currency.
+    @param permitDeadline Deadline of the currency permit.
+    @param permitSignature Currency permit for the total amount due, or empty
+           to use an existing allowance.
+    """
+    assert len(pawnIds) > 0, "empty batch"
+    currency: address = self.pawns[pawnIds[0]].currency
+    repaid: DynArray[PawnData, MAX_BATCH_SIZE] = []
+    lenders: DynArray[address, MAX_BATCH_SIZE] = []
+    amounts: DynArray[uint256, MAX_BATCH_SIZE] = []
+    total: uint256 = 0
+
+    for pawnId in pawnIds:
+        data: PawnData = self._pawnData(pawnId)
+        due: uint256 = self._amountDue(data)
+        assert data.terms.currency == currency, "batch must use one currency"
+        self._endPawn(pawnId, data, PawnState.REPAID)
+        repaid.append(data)
+        total += due
+
+        found: bool = False
+        for i in range(MAX_BATCH_SIZE):
+            if i == len(lenders):
+                break
+            if lenders[i] == data.lender:
+                amounts[i] += due
+                found = True
+                break
+        if not found:
+            lenders.append(data.lender)
+            amounts.append(due)
+
+    assert ERC20(currency).balanceOf(msg.sender) >= total
+
+    self._permitCurrency(currency, msg.sender, total, permitDeadline, permitSignature)
+    for i in range(MAX_BATCH_SIZE):
+        if i == len(lenders):
+            break
+        assert ERC20(currency).transferFrom(msg.sender, lenders[i], amounts[i])
+
+    for i in range(MAX_BATCH_SIZE):
+        if i == len(repaid):
+            break
+        ERC721(repaid[i].terms.nftVault).safeTransferFrom(self, repaid[i].borrower, repaid[i].terms.nftId, b"")
+        self._releaseBundle(pawnIds[i], repaid[i].borrower, self.reclaimStorage)
+        log PawnRepaid(pawnIds[i])
+
+    return True
+
 @external
 def acceptTermsAndFund(pawnId: uint256, permitDeadline: uint256, permitSignature: Bytes[65]) -> bool:
-    data: PawnData = self.idToData[pawnId]
+    data: PawnData = self._pawnData(pawnId)
     assert data.state == PawnState.CREATED
     assert ERC20(data.terms.currency).balanceOf(msg.sender) >=data.terms.principal
 
-    self.idToData[pawnId] = PawnData({
-        terms: data.terms,
-        state: PawnState.ACTIVE,
-        startTimestamp: block.timestamp,
-        borrower: data.borrower,
-        lender: msg.sender
-    })
+    self.pawns[pawnId].timing = self._packTiming(PawnState.ACTIVE, block.timestamp, data.terms.durationInSeconds)
+    self.pawns[pawnId].lender = msg.sender
+    self._addLenderPawn(msg.sender, pawnId)
+    self._addActivePawn(pawnId)
 
-    assert ERC20Permit(data.terms.currency).permit(msg.sender, self, data.terms.principal, permitDeadline, permitSignature)
+    self._permitCurrency(data.terms.currency, msg.sender, data.terms.principal, permitDeadline, permitSignature)
     assert ERC20(data.terms.currency).transferFrom(msg.sender, data.borrower, data.terms.principal)
 
     log PawnStarted(pawnId)
@@ -204,44 +584,498 @@ def acceptTermsAndFund(pawnId: uint256, permitDeadline: uint256, permitSignature
 
 @external
 def cancelTerms(pawnId: uint256) -> bool:
-    data: PawnData = self.idToData[pawnId]
+    data: PawnData = self._pawnData(pawnId)
     assert msg.sender == data.borrower
     assert data.state == PawnState.CREATED
     assert self == ERC721(data.terms.nftVault).ownerOf(data.terms.nftId)
-    self.idToData[pawnId] = empty(PawnData)
+    self.pawns[pawnId] = empty(PawnRecord)
     ERC721(data.terms.nftVault).safeTransferFrom(self, msg.sender, data.terms.nftId, b"")
     assert msg.sender == ERC721(data.terms.nftVault).ownerOf(data.terms.nftId)
+    self._releaseBundle(pawnId, msg.sender, True)
     log PawnCanceled(pawnId)
 
     return True
 
 @external
-def createTermsWithCollateral(terms: PawnTerms, permitDeadline: uint256, permitSignature: Bytes[65]) -> uint256:
+def setReclaimStorage(enabled: bool) -> bool:
+    """
+    @dev Choose whether repaid and defaulted pawns are cleared from storage,
+         refunding their slots, and kept only as PawnArchived logs. Pawns that
+         ended before it was turned on keep their records.
+    """
+    assert msg.sender == self.owner
+    self.reclaimStorage = enabled
+    return True
+
+@internal
+def _checkVault(nftVault: address):
+    # verify that vault supports ERC721
+    assert ERC165(nftVault).supportsInterface(ERC165_ID_OF_ERC721), "vault must support ERC721"
+    assert ERC165(nftVault).supportsInterface(ERC165_ID_OF_ERC721Permit), "vault must support ERC721Permit"
+
+@view
+@internal
+def _checkTerms(terms: PawnTerms, borrower: address, permitDeadline: uint256):
     assert terms.durationInSeconds > 0, "must have pawn positive duration"
+    assert terms.durationInSeconds <= UINT64_MASK, "pawn duration too long"
     assert block.timestamp < permitDeadline, "nft permit expired"
-    assert self.idToData[self.nextPawnId].state == empty(PawnState), "invalid contract state"
-    # verify that vault supports ERC721
-    assert ERC165(terms.nftVault).supportsInterface(ERC165_ID_OF_ERC721), "vault must support ERC721"
-    assert ERC165(terms.nftVault).supportsInterface(ERC165_ID_OF_ERC721Permit), "vault must support ERC721Permit"
     # sender only allowed to pawn an owned NFT 
-    assert msg.sender == ERC721(terms.nftVault).ownerOf(terms.nftId), "sender must own nft"
+    assert borrower == ERC721(terms.nftVault).ownerOf(terms.nftId), "sender must own nft"
+
+@internal
+def _escrowCollateral(nftVault: address, nftId: uint256, borrower: address, permitDeadline: uint256, permitSignature: Bytes[65]):
+    assert ERC721Permit(nftVault).permit(self, nftId, permitDeadline, permitSignature), "permit failed"
+    ERC721(nftVault).safeTransferFrom(borrower, self, nftId, b"")
+    assert self == ERC721(nftVault).ownerOf(nftId), "contract does not own nft"
+
+@internal
+def _releaseBundle(pawnId: uint256, receiver: address, clear: bool):
+    # Single-NFT pawns have an empty bundle, so only its length is read and
+    # nothing is written for them.
+    bundle: DynArray[BundleItem, MAX_BUNDLE_EXTRA] = self.bundles[pawnId]
+    for item in bundle:
+        ERC721(item.nftVault).safeTransferFrom(self, receiver, item.nftId, b"")
+    if clear and len(bundle) > 0:
+        self.bundles[pawnId] = []
+
+@internal
+def _archivePawn(pawnId: uint256, data: PawnData, state: PawnState):
+    # The bundle itself is cleared by _releaseBundle once it is handed out.
+    bundleVaults: DynArray[address, MAX_BUNDLE_EXTRA] = []
+    bundleIds: DynArray[uint256, MAX_BUNDLE_EXTRA] = []
+    bundle: DynArray[BundleItem, MAX_BUNDLE_EXTRA] = self.bundles[pawnId]
+    for item in bundle:
+        bundleVaults.append(item.nftVault)
+        bundleIds.append(item.nftId)
+    self.pawns[pawnId] = empty(PawnRecord)
+    log PawnArchived(
+        pawnId,
+        data.borrower,
+        data.lender,
+        convert(state, uint256),
+        data.terms.nftVault,
+        data.terms.nftId,
+        data.terms.currency,
+        data.terms.principal,
+        data.terms.interest,
+        data.terms.durationInSeconds,
+        data.startTimestamp,
+        bundleVaults,
+        bundleIds
+    )
+
+@internal
+def _endPawn(pawnId: uint256, data: PawnData, state: PawnState):
+    # Record the final state, or archive and clear the pawn when reclaiming
+    # storage. Either way the pawn leaves the active set.
+    if self.reclaimStorage:
+        self._archivePawn(pawnId, data, state)
+    else:
+        self.pawns[pawnId].timing = self._packTiming(state, data.startTimestamp, data.terms.durationInSeconds)
+    self._removeActivePawn(pawnId)
+
+@internal
+def _createTerms(pawnId: uint256, terms: PawnTerms, borrower: address, permitDeadline: uint256, permitSignature: Bytes[65]):
+    self._checkTerms(terms, borrower, permitDeadline)
+    assert self.pawns[pawnId].timing == 0, "invalid contract state"
+
+    self.pawns[pawnId] = PawnRecord({
+        nftVault: terms.nftVault,
+        nftId: terms.nftId,
+        currency: terms.currency,
+        principal: terms.principal,
+        interest: terms.interest,
+        borrower: borrower,
+        lender: empty(address),
+        timing: self._packTiming(PawnState.CREATED, empty(uint256), terms.durationInSeconds)
+    })
+    self._addBorrowerPawn(borrower, pawnId)
+    self._escrowCollateral(terms.nftVault, terms.nftId, borrower, permitDeadline, permitSignature)
+
+    log PawnCreated(pawnId)
+
+@external
+def createTermsWithCollateral(terms: PawnTerms, permitDeadline: uint256, permitSignature: Bytes[65]) -> uint256:
+    self._checkVault(terms.nftVault)
 
     pawnId: uint256 = self.nextPawnId
     self.nextPawnId += 1
 
-    pawnData: PawnData = PawnData({
-        terms: terms,
-        state: PawnState.CREATED,
-        startTimestamp: empty(uint256),
-        borrower: msg.sender,
-        lender: empty(address)
+    self._createTerms(pawnId, terms, msg.sender, permitDeadline, permitSignature)
+
+    return pawnId
+
+@external
+def createTermsWithCollateralBatch(
+        terms: DynArray[PawnTerms, MAX_BATCH_SIZE],
+        permitDeadlines: DynArray[uint256, MAX_BATCH_SIZE],
+        permitSignatures: DynArray[Bytes[65], MAX_BATCH_SIZE]
+    ) -> uint256:
+    """
+    @dev List several NFTs as collateral in one transaction. Each listing is
+         assigned a pawn ID from a contiguous range and emits its own PawnCreated.
+         ERC165 support is only checked once for each distinct vault in the batch.
+    @param terms Terms for each listing.
+    @param permitDeadlines NFT permit deadline for each listing.
+    @param permitSignatures NFT permit signature for each listing.
+    @return The pawn ID of the first listing; the rest follow sequentially.
+    """
+    count: uint256 = len(terms)
+    assert count > 0, "empty batch"
+    assert len(permitDeadlines) == count and len(permitSignatures) == count, "batch length mismatch"
+
+    checkedVaults: DynArray[address, MAX_BATCH_SIZE] = []
+    for t in terms:
+        if t.nftVault not in checkedVaults:
+            self._checkVault(t.nftVault)
+            checkedVaults.append(t.nftVault)
+
+    firstPawnId: uint256 = self.nextPawnId
+    self.nextPawnId = firstPawnId + count
+
+    for i in range(MAX_BATCH_SIZE):
+        if i == count:
+            break
+        self._createTerms(firstPawnId + i, terms[i], msg.sender, permitDeadlines[i], permitSignatures[i])
+
+    return firstPawnId
+
+@external
+def createBundleWithCollateral(
+        terms: PawnTerms,
+        extraItems: DynArray[BundleItem, MAX_BUNDLE_EXTRA],
+        permitDeadlines: DynArray[uint256, MAX_BUNDLE_SIZE],
+        permitSignatures: DynArray[Bytes[65], MAX_BUNDLE_SIZE]
+    ) -> uint256:
+    """
+    @dev List several NFTs as the collateral of a single pawn. The NFT in
+         `terms` is stored in the pawn's record and the rest in its bundle.
+         The whole bundle is escrowed now and released together on cancel,
+         repay or default.
+    @param terms Terms of the loan and the first NFT of the bundle.
+    @param extraItems The other NFTs of the bundle.
+    @param permitDeadlines NFT permit deadline for the first NFT, then for each
+           of `extraItems`.
+    @param permitSignatures NFT permit signature for the first NFT, then for
+           each of `extraItems`.
+    @return The ID of the new pawn.
+    """
+    count: uint256 = len(extraItems) + 1
+    assert len(permitDeadlines) == count and len(permitSignatures) == count, "bundle length mismatch"
+
+    self._checkVault(terms.nftVault)
+    checkedVaults: DynArray[address, MAX_BUNDLE_SIZE] = [terms.nftVault]
+    for item in extraItems:
+        if item.nftVault not in checkedVaults:
+            self._checkVault(item.nftVault)
+            checkedVaults.append(item.nftVault)
+
+    pawnId: uint256 = self.nextPawnId
+    self.nextPawnId = pawnId + 1
+
+    self.bundles[pawnId] = extraItems
+    for i in range(MAX_BUNDLE_EXTRA):
+        if i == len(extraItems):
+            break
+        assert msg.sender == ERC721(extraItems[i].nftVault).ownerOf(extraItems[i].nftId), "sender must own nft"
+        self._escrowCollateral(extraItems[i].nftVault, extraItems[i].nftId, msg.sender, permitDeadlines[i + 1], permitSignatures[i + 1])
+    self._createTerms(pawnId, terms, msg.sender, permitDeadlines[0], permitSignatures[0])
+
+    return pawnId
+
+@internal
+def _openFundedPawn(
+        terms: PawnTerms,
+        borrower: address,
+        lender: address,
+        nftPermitDeadline: uint256,
+        nftPermitSignature: Bytes[65],
+        currencyPermitDeadline: uint256,
+        currencyPermitSignature: Bytes[65]
+    ) -> uint256:
+    # Writes the pawn straight into the ACTIVE state, skipping the listing.
+    self._checkVault(terms.nftVault)
+    self._checkTerms(terms, borrower, nftPermitDeadline)
+    assert ERC20(terms.currency).balanceOf(lender) >= terms.principal
+
+    pawnId: uint256 = self.nextPawnId
+    self.nextPawnId = pawnId + 1
+
+    self.pawns[pawnId] = PawnRecord({
+        nftVault: terms.nftVault,
+        nftId: terms.nftId,
+        currency: terms.currency,
+        principal: terms.principal,
+        interest: terms.interest,
+        borrower: borrower,
+        lender: lender,
+        timing: self._packTiming(PawnState.ACTIVE, block.timestamp, terms.durationInSeconds)
     })
-    self.idToData[pawnId] = pawnData
+    self._addBorrowerPawn(borrower, pawnId)
+    self._addLenderPawn(lender, pawnId)
+    self._addActivePawn(pawnId)
 
-    assert ERC721Permit(terms.nftVault).permit(self, terms.nftId, permitDeadline, permitSignature), "permit failed"
-    ERC721(terms.nftVault).safeTransferFrom(msg.sender, self, terms.nftId, b"")
-    assert self == ERC721(terms.nftVault).ownerOf(terms.nftId), "contract does not own nft"
+    self._escrowCollateral(terms.nftVault, terms.nftId, borrower, nftPermitDeadline, nftPermitSignature)
+    self._permitCurrency(terms.currency, lender, terms.principal, currencyPermitDeadline, currencyPermitSignature)
+    assert ERC20(terms.currency).transferFrom(lender, borrower, terms.principal)
 
     log PawnCreated(pawnId)
+    log PawnStarted(pawnId)
+    return pawnId
+
+@view
+@internal
+def _lendOfferHash(offer: LendOffer) -> bytes32:
+    return keccak256(
+        concat(
+            b'\x19\x01',
+            self.DOMAIN_SEPARATOR,
+            keccak256(
+                _abi_encode(
+                    LEND_OFFER_TYPE_HASH,
+                    offer.lender,
+                    offer.nftVault,
+                    offer.nftId,
+                    offer.currency,
+                    offer.principal,
+                    offer.interest,
+                    offer.durationInSeconds,
+                    offer.salt,
+                    offer.deadline
+                )
+            )
+        )
+    )
+
+@view
+@internal
+def _collectionOfferHash(offer: CollectionOffer) -> bytes32:
+    return keccak256(
+        concat(
+            b'\x19\x01',
+            self.DOMAIN_SEPARATOR,
+            keccak256(
+                _abi_encode(
+                    COLLECTION_OFFER_TYPE_HASH,
+                    offer.lender,
+                    offer.nftVault,
+                    offer.currency,
+                    offer.principal,
+                    offer.interest,
+                    offer.durationInSeconds,
+                    offer.maxFills,
+                    offer.salt,
+                    offer.deadline
+                )
+            )
+        )
+    )
+
+@pure
+@internal
+def _recoverSigner(digest: bytes32, sig: Bytes[65]) -> address:
+    r: uint256 = convert(slice(sig, 0, 32), uint256)
+    s: uint256 = convert(slice(sig, 32, 32), uint256)
+    v: uint256 = convert(slice(sig, 64, 1), uint256)
+    return ecrecover(digest, v, r, s)
+
+@internal
+def _useOffer(offerHash: bytes32, lender: address, deadline: uint256, maxFills: uint256, offerSignature: Bytes[65]):
+    assert block.timestamp <= deadline, "offer expired"
+    fills: uint256 = self.offerFills[offerHash]
+    assert fills < maxFills, "offer filled or canceled"
+    assert lender != empty(address), "invalid offer signature"
+    assert self._recoverSigner(offerHash, offerSignature) == lender, "invalid offer signature"
+    self.offerFills[offerHash] = fills + 1
+
+@internal
+def _cancelOffer(offerHash: bytes32, lender: address):
+    self.offerFills[offerHash] = max_value(uint256)
+    log LendOfferCanceled(offerHash, lender)
+
+@view
+@external
+def hashLendOffer(offer: LendOffer) -> bytes32:
+    return self._lendOfferHash(offer)
+
+@external
+def fillLendOffer(
+        offer: LendOffer,
+        offerSignature: Bytes[65],
+        nftPermitDeadline: uint256,
+        nftPermitSignature: Bytes[65],
+        currencyPermitDeadline: uint256,
+        currencyPermitSignature: Bytes[65]
+    ) -> uint256:
+    """
+    @dev Pledge an NFT and take a lender's signed offer for it in one
+         transaction. The NFT is escrowed and the principal moves from the
+         lender to the sender; the pawn starts out ACTIVE and emits both
+         PawnCreated and PawnStarted. Each offer can be filled once.
+    @param offer The lender's offer; the sender must own `offer.nftId`.
+    @param offerSignature The lender's EIP-712 signature of `offer`.
+    @param nftPermitDeadline Deadline of the NFT permit.
+    @param nftPermitSignature NFT permit signed by the sender.
+    @param currencyPermitDeadline Deadline of the currency permit.
+    @param currencyPermitSignature Currency permit for the principal signed by
+           the lender, or empty to use the lender's existing allowance.
+    @return The ID of the new pawn.
+    """
+    offerHash: bytes32 = self._lendOfferHash(offer)
+    self._useOffer(offerHash, offer.lender, offer.deadline, 1, offerSignature)
+
+    terms: PawnTerms = PawnTerms({
+        nftVault: offer.nftVault,
+        nftId: offer.nftId,
+        currency: offer.currency,
+        principal: offer.principal,
+        interest: offer.interest,
+        durationInSeconds: offer.durationInSeconds
+    })
+    pawnId: uint256 = self._openFundedPawn(
+        terms,
+        msg.sender,
+        offer.lender,
+        nftPermitDeadline,
+        nftPermitSignature,
+        currencyPermitDeadline,
+        currencyPermitSignature
+    )
+
+    log LendOfferFilled(offerHash, pawnId)
+    return pawnId
+
+@external
+def cancelLendOffer(offer: LendOffer) -> bool:
+    """
+    @dev Permanently withdraw one of the sender's signed offers.
+    """
+    assert msg.sender == offer.lender
+    self._cancelOffer(self._lendOfferHash(offer), msg.sender)
+    return True
+
+@view
+@external
+def hashCollectionOffer(offer: CollectionOffer) -> bytes32:
+    return self._collectionOfferHash(offer)
+
+@external
+def fillCollectionOffer(
+        offer: CollectionOffer,
+        offerSignature: Bytes[65],
+        nftId: uint256,
+        nftPermitDeadline: uint256,
+        nftPermitSignature: Bytes[65],
+        currencyPermitDeadline: uint256,
+        currencyPermitSignature: Bytes[65]
+    ) -> uint256:
+    """
+    @dev Pledge any NFT from the offer's vault and take one fill of a lender's
+         signed collection offer, as in `fillLendOffer`. The offer can be
+         filled up to `offer.maxFills` times in total.
+    @param offer The lender's collection offer.
+    @param offerSignature The lender's EIP-712 signature of `offer`.
+    @param nftId NFT from `offer.nftVault` owned by the sender.
+    @param nftPermitDeadline Deadline of the NFT permit.
+    @param nftPermitSignature NFT permit signed by the sender.
+    @param currencyPermitDeadline Deadline of the currency permit.
+    @param currencyPermitSignature Currency permit for the principal signed by
+           the lender, or empty to use the lender's existing allowance.
+    @return The ID of the new pawn.
+    """
+    offerHash: bytes32 = self._collectionOfferHash(offer)
+    self._useOffer(offerHash, offer.lender, offer.deadline, offer.maxFills, offerSignature)
+
+    terms: PawnTerms = PawnTerms({
+        nftVault: offer.nftVault,
+        nftId: nftId,
+        currency: offer.currency,
+        principal: offer.principal,
+        interest: offer.interest,
+        durationInSeconds: offer.durationInSeconds
+    })
+    pawnId: uint256 = self._openFundedPawn(
+        terms,
+        msg.sender,
+        offer.lender,
+        nftPermitDeadline,
+        nftPermitSignature,
+        currencyPermitDeadline,
+        currencyPermitSignature
+    )
+
+    log LendOfferFilled(offerHash, pawnId)
+    return pawnId
 
-    return pawnId
\ No newline at end of file
+@external
+def cancelCollectionOffer(offer: CollectionOffer) -> bool:
+    """
+    @dev Permanently withdraw the unfilled remainder of one of the sender's
+         collection offers.
+    """
+    assert msg.sender == offer.lender
+    self._cancelOffer(self._collectionOfferHash(offer), msg.sender)
+    return True
+
+@external
+def refinance(
+        pawnId: uint256,
+        offer: LendOffer,
+        offerSignature: Bytes[65],
+        currencyPermitDeadline: uint256,
+        currencyPermitSignature: Bytes[65],
+        repayPermitDeadline: uint256,
+        repayPermitSignature: Bytes[65]
+    ) -> bool:
+    """
+    @dev Move an active pawn onto a new lender's signed offer for the same NFT
+         and currency. The new principal pays off the amount due to the
+         current lender and any excess goes to the borrower; a shortfall is
+         paid by the borrower. The record is updated in place and the loan
+         restarts now with the offer's interest and duration, while the NFT
+         stays in escrow. A new lender gets the pawn added to its index; the
+         previous lender's index keeps its entry, like any pawn it once funded.
+    @param pawnId The pawn to refinance; the sender must be its borrower.
+    @param offer The new lender's offer for the pawned NFT.
+    @param offerSignature The new lender's EIP-712 signature of `offer`.
+    @param currencyPermitDeadline Deadline of the new lender's currency permit.
+    @param currencyPermitSignature Currency permit for the new principal signed
+           by the new lender, or empty to use the new lender's allowance.
+    @param repayPermitDeadline Deadline of the borrower's currency permit.
+    @param repayPermitSignature Currency permit for the shortfall signed by the
+           sender, or empty to use the sender's allowance. Unused when the new
+           principal covers the amount due.
+    """
+    data: PawnData = self._pawnData(pawnId)
+    assert msg.sender == data.borrower
+    due: uint256 = self._amountDue(data)
+    assert offer.nftVault == data.terms.nftVault and offer.nftId == data.terms.nftId, "offer is for another nft"
+    assert offer.currency == data.terms.currency, "offer currency mismatch"
+    assert offer.durationInSeconds > 0, "must have pawn positive duration"
+    assert offer.durationInSeconds <= UINT64_MASK, "pawn duration too long"
+
+    offerHash: bytes32 = self._lendOfferHash(offer)
+    self._useOffer(offerHash, offer.lender, offer.deadline, 1, offerSignature)
+
+    self.pawns[pawnId].principal = offer.principal
+    self.pawns[pawnId].interest = offer.interest
+    self.pawns[pawnId].lender = offer.lender
+    self.pawns[pawnId].timing = self._packTiming(PawnState.ACTIVE, block.timestamp, offer.durationInSeconds)
+    if offer.lender != data.lender:
+        self._addLenderPawn(offer.lender, pawnId)
+
+    currency: address = data.terms.currency
+    self._permitCurrency(currency, offer.lender, offer.principal, currencyPermitDeadline, currencyPermitSignature)
+    if offer.principal >= due:
+        assert ERC20(currency).transferFrom(offer.lender, data.lender, due)
+        if offer.principal > due:
+            assert ERC20(currency).transferFrom(offer.lender, msg.sender, offer.principal - due)
+    else:
+        if offer.principal > 0:
+            assert ERC20(currency).transferFrom(offer.lender, data.lender, offer.principal)
+        self._permitCurrency(currency, msg.sender, due - offer.principal, repayPermitDeadline, repayPermitSignature)
+        assert ERC20(currency).transferFrom(msg.sender, data.lender, due - offer.principal)
+
+    log PawnRefinanced(pawnId, data.lender, offer.lender)
+    log LendOfferFilled(offerHash, pawnId)
+    return True
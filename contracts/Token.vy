@@ -10,6 +10,9 @@ NAME: constant(String[20]) = "TokenTest"
 SYMBOL: constant(String[5]) = "TKN"
 DECIMALS: constant(uint8) = 18
 
+# Maximum number of receivers in one batch call
+MAX_BATCH: constant(uint256) = 500
+
 # ERC20 State Variables
 totalSupply: public(uint256)
 balanceOf: public(HashMap[address, uint256])
@@ -81,6 +84,30 @@ def transfer(receiver: address, amount: uint256) -> bool:
     return True
 
 
+@external
+def transferBatch(receivers: DynArray[address, MAX_BATCH], amounts: DynArray[uint256, MAX_BATCH]) -> bool:
+    """
+    @notice Transfers `amounts[i]` to `receivers[i]` for every i, debiting the
+            sender's balance once for the total.
+    @param receivers The addresses that will receive the tokens.
+    @param amounts The amount sent to each receiver.
+    @return A boolean that indicates if the operation was successful.
+    """
+    assert len(receivers) == len(amounts), "length mismatch"
+
+    total: uint256 = 0
+    for i in range(MAX_BATCH):
+        if i == len(receivers):
+            break
+        assert receivers[i] not in [empty(address), self]
+        self.balanceOf[receivers[i]] += amounts[i]
+        total += amounts[i]
+        log Transfer(msg.sender, receivers[i], amounts[i])
+
+    self.balanceOf[msg.sender] -= total
+    return True
+
+
 @external
 def transferFrom(sender:address, receiver: address, amount: uint256) -> bool:
     assert receiver not in [empty(address), self]
@@ -134,6 +161,30 @@ def mint(receiver: address, amount: uint256) -> bool:
 
     return True
 
+@external
+def mintBatch(receivers: DynArray[address, MAX_BATCH], amounts: DynArray[uint256, MAX_BATCH]) -> bool:
+    """
+    @notice Mints `amounts[i]` to `receivers[i]` for every i, updating the total
+            supply once.
+    @param receivers The addresses that will receive the minted tokens.
+    @param amounts The amount minted to each receiver.
+    @return A boolean that indicates if the operation was successful.
+    """
+    assert msg.sender == self.owner or self.isMinter[msg.sender], "Access is denied."
+    assert len(receivers) == len(amounts), "length mismatch"
+
+    total: uint256 = 0
+    for i in range(MAX_BATCH):
+        if i == len(receivers):
+            break
+        assert receivers[i] not in [empty(address), self]
+        self.balanceOf[receivers[i]] += amounts[i]
+        total += amounts[i]
+        log Transfer(empty(address), receivers[i], amounts[i])
+
+    self.totalSupply += total
+    return True
+
 @external
 def addMinter(target: address) -> bool:
     assert msg.sender == self.owner
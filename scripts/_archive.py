@@ -0,0 +1,86 @@
+"""
+Reconstruction of pawns whose storage NiftyPawn reclaimed, from their
+PawnArchived logs.
+"""
+from ape import chain
+from collections import namedtuple
+
+# mirrors of NiftyPawn.PawnTerms, NiftyPawn.PawnData and NiftyPawn.BundleItem
+PawnTerms = namedtuple("PawnTerms", "nftVault nftId currency principal interest durationInSeconds")
+PawnData = namedtuple("PawnData", "terms state startTimestamp borrower lender")
+BundleItem = namedtuple("BundleItem", "nftVault nftId")
+
+ArchivedPawn = namedtuple("ArchivedPawn", "pawn_id data bundle block_number transaction_hash")
+
+
+def archived_pawn(log):
+    """
+    Build an ArchivedPawn from a decoded PawnArchived log. `bundle` lists
+    every pledged NFT, as `bundleOf` did before the pawn was cleared.
+    """
+    terms = PawnTerms(log.nftVault, log.nftId, log.currency, log.principal, log.interest, log.durationInSeconds)
+    data = PawnData(terms, log.state, log.startTimestamp, log.borrower, log.lender)
+    bundle = [BundleItem(log.nftVault, log.nftId)]
+    bundle.extend(BundleItem(vault, nft_id) for vault, nft_id in zip(log.bundleVaults, log.bundleIds))
+    return ArchivedPawn(log.pawnId, data, bundle, log.block_number, log.transaction_hash)
+
+
+class PawnArchive:
+    """
+    Reads finished pawns back from PawnArchived logs.
+
+    Pawns repaid or claimed while `reclaimStorage` is on read as empty from
+    `idToData`. `pawn_data` falls back to the archive for those, so callers
+    get the final PawnData of any pawn whether or not its record was cleared.
+
+        archive = PawnArchive(pawn, start_block=deploy_block)
+        for archived in archive.pawns(lender=lender.address):
+            print(archived.pawn_id, archived.data.state)
+    """
+
+    def __init__(self, pawn, start_block=0):
+        self.pawn = pawn
+        self.start_block = start_block
+        # pawnId => ArchivedPawn, filled by lookups
+        self._cache = {}
+
+    def pawns(self, start_block=None, stop_block=None, borrower=None, lender=None):
+        """
+        Yield the pawns archived in [start_block, stop_block), optionally only
+        those of one borrower or lender.
+        """
+        start = self.start_block if start_block is None else start_block
+        stop = chain.blocks.head.number + 1 if stop_block is None else stop_block
+        topics = {}
+        if borrower is not None:
+            topics["borrower"] = borrower
+        if lender is not None:
+            topics["lender"] = lender
+        for log in self.pawn.PawnArchived.range(start, stop, search_topics=topics or None):
+            archived = archived_pawn(log)
+            self._cache[archived.pawn_id] = archived
+            yield archived
+
+    def get(self, pawn_id):
+        """
+        Return the ArchivedPawn of `pawn_id`, or None if it was never archived.
+        """
+        if pawn_id not in self._cache:
+            stop = chain.blocks.head.number + 1
+            logs = list(self.pawn.PawnArchived.range(self.start_block, stop, search_topics={"pawnId": pawn_id}))
+            if not logs:
+                return None
+            self._cache[pawn_id] = archived_pawn(logs[-1])
+        return self._cache[pawn_id]
+
+    def pawn_data(self, pawn_id):
+        """
+        Return the current PawnData of `pawn_id` from contract storage, or its
+        final PawnData from the archive once its record was cleared. Canceled
+        pawns are not archived and read as empty.
+        """
+        data = self.pawn.idToData(pawn_id)
+        if data.state != 0:
+            return data
+        archived = self.get(pawn_id)
+        return data if archived is None else archived.data
@@ -0,0 +1,75 @@
+"""
+Batch view calls to any contract through the Multicall contract.
+"""
+from ape import chain
+from ape import networks
+
+MAX_CALLS = 128 # Multicall.MAX_CALLS
+
+
+class Multicall:
+    """
+    Queue view calls with `add` and read them all in one `eth_call` per
+    MAX_CALLS calls with `execute`. Every chunk is read at the same block.
+
+        reads = Multicall(multicall)
+        reads.add(token, "balanceOf", lender)
+        reads.add(nft, "ownerOf", 0)
+        balance, owner = reads.execute()
+    """
+
+    def __init__(self, multicall):
+        self.multicall = multicall
+        self.calls = []
+
+    @property
+    def ecosystem(self):
+        return networks.provider.network.ecosystem
+
+    def _abi(self, contract, method_name, args):
+        abis = getattr(contract, method_name).abis
+        matches = [abi for abi in abis if len(abi.inputs) == len(args)]
+        if not matches:
+            raise ValueError(f"{method_name} has no overload taking {len(args)} arguments")
+        return matches[0]
+
+    def _encode(self, abi, args):
+        return self.ecosystem.get_method_selector(abi) + self.ecosystem.encode_calldata(abi, *args)
+
+    def _decode(self, abi, data):
+        output = self.ecosystem.decode_returndata(abi, data)
+        if isinstance(output, (list, tuple)) and len(abi.outputs) == 1:
+            return output[0]
+        return output
+
+    def add(self, contract, method_name, *args):
+        """
+        Queue `contract.method_name(*args)`.
+        @return The index of its result in the list returned by `execute`.
+        """
+        abi = self._abi(contract, method_name, args)
+        self.calls.append((contract.address, abi, self._encode(abi, args)))
+        return len(self.calls) - 1
+
+    def execute(self, block_identifier=None):
+        """
+        Run the queued calls at `block_identifier` (the current head by
+        default) and clear the queue.
+        @return The decoded result of each call, or None for calls that failed
+                or returned more than the contract's MAX_RETURNDATA (1024) bytes.
+        """
+        if block_identifier is None:
+            block_identifier = chain.blocks.head.number
+        aggregate = self._abi(self.multicall, "aggregate", [None])
+
+        results = []
+        for start in range(0, len(self.calls), MAX_CALLS):
+            chunk = self.calls[start:start + MAX_CALLS]
+            data = self._encode(aggregate, [[(target, calldata) for target, _, calldata in chunk]])
+            raw = networks.provider.web3.eth.call({"to": self.multicall.address, "data": data}, block_identifier)
+            _, responses = self._decode(aggregate, raw)
+            for (_, abi, _), response in zip(chunk, responses):
+                results.append(self._decode(abi, response[1]) if response[0] else None)
+
+        self.calls = []
+        return results
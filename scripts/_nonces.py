@@ -0,0 +1,85 @@
+"""
+Local tracking of permit nonces so batches of permits can be signed without a
+`nonces` call before every signature.
+"""
+from contextlib import contextmanager
+import threading
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+
+class PermitNonces:
+    """
+    Caches the `nonces` of a Token (keyed by owner address) or an NFT (keyed
+    by token ID) and hands out consecutive values as permits are signed.
+
+    Values are loaded from the contract on first use. Call `resync` after a
+    transaction that may have consumed fewer nonces than were handed out (e.g.
+    it reverted), and feed NFT Transfer logs to `observe_transfers`, since the
+    NFT bumps a token's nonce on every transfer (but not when minting it).
+    """
+
+    def __init__(self, contract):
+        self.contract = contract
+        self._nonces = {}
+        self._lock = threading.Lock()
+
+    def _load(self, key):
+        if key not in self._nonces:
+            self._nonces[key] = self.contract.nonces(key)
+        return self._nonces[key]
+
+    def load(self, keys):
+        with self._lock:
+            for key in keys:
+                self._load(key)
+
+    def peek(self, key):
+        with self._lock:
+            return self._load(key)
+
+    def next(self, key):
+        """
+        Return the nonce to sign the next permit for `key` with and reserve it.
+        """
+        with self._lock:
+            nonce = self._load(key)
+            self._nonces[key] = nonce + 1
+            return nonce
+
+    def bump(self, key, count=1):
+        with self._lock:
+            if key in self._nonces:
+                self._nonces[key] += count
+
+    def resync(self, *keys):
+        """
+        Forget the cached nonces of `keys` (or of every key if none are given)
+        so they are reloaded from the contract on next use.
+        """
+        with self._lock:
+            if keys:
+                for key in keys:
+                    self._nonces.pop(key, None)
+            else:
+                self._nonces.clear()
+
+    def observe_transfers(self, logs):
+        """
+        Account for NFT Transfer logs. Each log must be observed only once.
+        Mints are skipped, as NFT.mint and NFT.mintBatch leave nonces alone.
+        """
+        for log in logs:
+            if log.sender != ZERO_ADDRESS:
+                self.bump(log.tokenId)
+
+    @contextmanager
+    def resync_on_failure(self, *keys):
+        """
+        Resync `keys` if the wrapped transaction raises.
+        """
+        try:
+            yield
+        except Exception:
+            self.resync(*keys)
+            raise
@@ -0,0 +1,204 @@
+"""
+Local order book of signed NiftyPawn lend and collection offers.
+"""
+from eth_account import Account
+from eth_utils import to_checksum_address
+import sqlite3
+import time
+
+from scripts._signing import CollectionOffer, LendOffer, PAWN_DOMAIN_NAME, domain_separator, offer_message, offer_hash
+
+OPEN = "OPEN"
+FILLED = "FILLED"
+CANCELED = "CANCELED"
+EXPIRED = "EXPIRED"
+
+# uint256 values are stored as zero-padded decimal text, which sorts and
+# compares like the numbers themselves. Collection offers have no nft_id.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS offers (
+    offer_hash TEXT PRIMARY KEY,
+    lender TEXT NOT NULL,
+    nft_vault TEXT NOT NULL,
+    nft_id TEXT,
+    currency TEXT NOT NULL,
+    principal TEXT NOT NULL,
+    interest TEXT NOT NULL,
+    duration INTEGER NOT NULL,
+    salt TEXT NOT NULL,
+    deadline INTEGER NOT NULL,
+    max_fills INTEGER NOT NULL,
+    fills INTEGER NOT NULL,
+    signature BLOB NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS offers_match ON offers (status, currency, nft_vault, nft_id, duration, principal);
+CREATE INDEX IF NOT EXISTS offers_lender ON offers (lender);
+"""
+
+
+MAX_FILLS = 2 ** 63 - 1 # largest max_fills SQLite stores as an integer
+
+
+def _u256(value):
+    return f"{int(value):078d}"
+
+def _address(value):
+    return to_checksum_address(str(value))
+
+def _hex(value):
+    return "0x" + bytes(value).hex()
+
+
+class OrderBook:
+    """
+    Stores signed LendOffers and CollectionOffers in SQLite and matches them
+    to borrowers.
+
+    Offers are keyed by the same EIP-712 hash NiftyPawn uses, and their
+    signatures are checked against the offer's lender when added. `sync` reads
+    LendOfferFilled and LendOfferCanceled logs, counting collection offer fills,
+    so offers used up or withdrawn on chain stop matching. Offers come back as
+    LendOffer or CollectionOffer tuples, which tells the borrower whether to
+    call `fillLendOffer` or `fillCollectionOffer`.
+
+        book = OrderBook(chain, pawn)
+        book.add(offer, getLendOffer(chain, pawn, lender, offer))
+        offer, signature = book.best(token.address, nft.address, nft_id, min_principal=1000)
+    """
+
+    def __init__(self, chain, pawn, db_path=":memory:"):
+        self.pawn = pawn
+        self.domain = domain_separator(chain, pawn, PAWN_DOMAIN_NAME)
+        self.db = sqlite3.connect(db_path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def add(self, offer, signature):
+        """
+        Add a signed offer. Plain tuples are taken as LendOffers.
+        @return The offer hash.
+        """
+        if not isinstance(offer, CollectionOffer):
+            offer = LendOffer(*offer)
+        signer = Account.recover_message(offer_message(self.domain, offer), signature=bytes(signature))
+        if signer != _address(offer.lender):
+            raise ValueError(f"offer is signed by {signer}, not by its lender {offer.lender}")
+        if isinstance(offer, CollectionOffer):
+            nft_id, max_fills = None, min(offer.maxFills, MAX_FILLS)
+        else:
+            nft_id, max_fills = _u256(offer.nftId), 1
+        key = _hex(offer_hash(self.domain, offer))
+        with self.db:
+            self.db.execute(
+                "INSERT OR IGNORE INTO offers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?)",
+                (
+                    key,
+                    _address(offer.lender),
+                    _address(offer.nftVault),
+                    nft_id,
+                    _address(offer.currency),
+                    _u256(offer.principal),
+                    _u256(offer.interest),
+                    offer.durationInSeconds,
+                    _u256(offer.salt),
+                    offer.deadline,
+                    max_fills,
+                    bytes(signature),
+                    OPEN,
+                ),
+            )
+        return key
+
+    def _offer(self, row):
+        if row["nft_id"] is None:
+            offer = CollectionOffer(
+                row["lender"],
+                row["nft_vault"],
+                row["currency"],
+                int(row["principal"]),
+                int(row["interest"]),
+                row["duration"],
+                row["max_fills"],
+                int(row["salt"]),
+                row["deadline"],
+            )
+        else:
+            offer = LendOffer(
+                row["lender"],
+                row["nft_vault"],
+                int(row["nft_id"]),
+                row["currency"],
+                int(row["principal"]),
+                int(row["interest"]),
+                row["duration"],
+                int(row["salt"]),
+                row["deadline"],
+            )
+        return offer, row["signature"]
+
+    def get(self, offer_hash):
+        row = self.db.execute("SELECT * FROM offers WHERE offer_hash = ?", (offer_hash,)).fetchone()
+        return self._offer(row) if row else None
+
+    def match(self, currency, nft_vault, nft_id, min_principal=0, max_duration=None, now=None, limit=10):
+        """
+        Open, unexpired offers for an NFT, including collection offers for its
+        vault, in `currency` lending at least `min_principal` for at most
+        `max_duration` seconds, cheapest interest first and then largest
+        principal.
+        @return (LendOffer, signature) pairs.
+        """
+        query = """
+            SELECT * FROM offers
+            WHERE status = ? AND currency = ? AND nft_vault = ? AND (nft_id = ? OR nft_id IS NULL)
+            AND principal >= ? AND deadline >= ?
+        """
+        params = [OPEN, _address(currency), _address(nft_vault), _u256(nft_id), _u256(min_principal), int(time.time() if now is None else now)]
+        if max_duration is not None:
+            query += " AND duration <= ?"
+            params.append(max_duration)
+        query += " ORDER BY interest, principal DESC LIMIT ?"
+        params.append(limit)
+        return [self._offer(row) for row in self.db.execute(query, params)]
+
+    def best(self, currency, nft_vault, nft_id, **criteria):
+        offers = self.match(currency, nft_vault, nft_id, limit=1, **criteria)
+        return offers[0] if offers else None
+
+    def offers_of(self, lender, status=OPEN):
+        rows = self.db.execute("SELECT * FROM offers WHERE lender = ? AND status = ? ORDER BY deadline", (_address(lender), status))
+        return [self._offer(row) for row in rows]
+
+    def set_status(self, offer_hash, status):
+        with self.db:
+            self.db.execute("UPDATE offers SET status = ? WHERE offer_hash = ?", (status, offer_hash))
+
+    def expire(self, now=None):
+        """
+        Mark open offers past their deadline as expired.
+        @return The number of offers expired.
+        """
+        with self.db:
+            cursor = self.db.execute(
+                "UPDATE offers SET status = ? WHERE status = ? AND deadline < ?",
+                (EXPIRED, OPEN, int(time.time() if now is None else now)),
+            )
+        return cursor.rowcount
+
+    def sync(self, start_block, stop_block):
+        """
+        Apply the offer fills and cancellations logged in [start_block, stop_block).
+        """
+        with self.db:
+            self.db.executemany(
+                """
+                UPDATE offers SET fills = fills + 1, status = CASE WHEN fills + 1 >= max_fills THEN ? ELSE status END
+                WHERE offer_hash = ? AND status != ?
+                """,
+                [(FILLED, _hex(log.offerHash), CANCELED) for log in self.pawn.LendOfferFilled.range(start_block, stop_block)],
+            )
+            self.db.executemany(
+                "UPDATE offers SET status = ? WHERE offer_hash = ?",
+                [(CANCELED, _hex(log.offerHash)) for log in self.pawn.LendOfferCanceled.range(start_block, stop_block)],
+            )
@@ -0,0 +1,131 @@
+"""
+Concurrent transaction submission for the scripts.
+"""
+import asyncio
+import time
+
+from ape import chain
+from ape import networks
+from web3.exceptions import TransactionNotFound
+
+MAX_IN_FLIGHT = 32 # transactions awaiting a receipt at once
+REPLACE_AFTER = 30 # seconds without a receipt before a fee-bumped replacement
+MAX_REPLACEMENTS = 3
+FEE_BUMP = 1.125 # nodes require at least a 10% bump to replace a transaction
+POLL_INTERVAL = 0.5 # seconds between receipt checks
+
+
+class TransactionPipeline:
+    """
+    Signs and broadcasts contract transactions concurrently.
+
+    Sender nonces are fetched once and assigned locally, so any number of
+    transactions from one account can be in the mempool at the same time. At
+    most `max_in_flight` transactions wait for a receipt at once. A transaction
+    that has no receipt after `replace_after` seconds is re-sent with the same
+    nonce and bumped fees. The blocking ape and web3 calls run in worker
+    threads so the event loop stays responsive.
+
+        pipeline = TransactionPipeline(gas_limit=100000000, gas_price=0)
+        receipt, logs = await pipeline.submit(
+            pawn.createTermsWithCollateral, terms, deadline, signature,
+            sender=borrower, events=[pawn.PawnCreated],
+        )
+    """
+
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, replace_after=REPLACE_AFTER, max_replacements=MAX_REPLACEMENTS, **tx_kwargs):
+        self.window = asyncio.Semaphore(max_in_flight)
+        self.replace_after = replace_after
+        self.max_replacements = max_replacements
+        self.tx_kwargs = tx_kwargs
+        self._nonces = {}
+        self._nonce_locks = {}
+
+    @property
+    def web3(self):
+        return networks.provider.web3
+
+    async def _next_nonce(self, sender):
+        lock = self._nonce_locks.setdefault(sender.address, asyncio.Lock())
+        async with lock:
+            if sender.address not in self._nonces:
+                self._nonces[sender.address] = await asyncio.to_thread(
+                    self.web3.eth.get_transaction_count, sender.address, "pending"
+                )
+            nonce = self._nonces[sender.address]
+            self._nonces[sender.address] = nonce + 1
+            return nonce
+
+    def resync(self, sender):
+        """
+        Reload `sender`'s nonce from the node on its next transaction.
+        """
+        self._nonces.pop(sender.address, None)
+
+    def _sign(self, handler, args, sender, nonce):
+        txn = handler.as_transaction(*args, sender=sender, nonce=nonce, **self.tx_kwargs)
+        return sender.sign_transaction(txn)
+
+    def _bump_fees(self, txn):
+        for field in ("max_fee", "max_priority_fee", "gas_price"):
+            value = getattr(txn, field, None)
+            if value is not None:
+                setattr(txn, field, max(int(value * FEE_BUMP), value + 1))
+        txn.signature = None
+        return txn
+
+    def _send(self, signed):
+        return self.web3.eth.send_raw_transaction(signed.serialize_transaction()).hex()
+
+    def _find_receipt(self, txn_hashes):
+        for txn_hash in txn_hashes:
+            try:
+                self.web3.eth.get_transaction_receipt(txn_hash)
+            except TransactionNotFound:
+                continue
+            return chain.provider.get_receipt(txn_hash)
+        return None
+
+    async def submit(self, handler, *args, sender, events=()):
+        """
+        Sign and broadcast `handler(*args)` from `sender` and wait for it to be
+        mined, replacing it if it gets stuck.
+        @return The receipt and a dict of event name => decoded logs for each
+                of `events`.
+        """
+        async with self.window:
+            nonce = await self._next_nonce(sender)
+            try:
+                signed = await asyncio.to_thread(self._sign, handler, args, sender, nonce)
+                txn_hashes = [await asyncio.to_thread(self._send, signed)]
+            except Exception:
+                self.resync(sender)
+                raise
+
+            sent_at = time.monotonic()
+            replacements = 0
+            while (receipt := await asyncio.to_thread(self._find_receipt, txn_hashes)) is None:
+                if time.monotonic() - sent_at > self.replace_after and replacements < self.max_replacements:
+                    signed = sender.sign_transaction(self._bump_fees(signed))
+                    try:
+                        txn_hashes.append(await asyncio.to_thread(self._send, signed))
+                    except ValueError as err:
+                        # the original was mined in the meantime or the node
+                        # rejected the bump; keep waiting on what was sent
+                        print(f"Replacement of nonce {nonce} for {sender.address} not sent: {err}")
+                    replacements += 1
+                    sent_at = time.monotonic()
+                await asyncio.sleep(POLL_INTERVAL)
+
+        logs = {event.name: list(receipt.decode_logs(event)) for event in events}
+        return receipt, logs
+
+    async def submit_all(self, calls):
+        """
+        Submit (handler, args, sender, events) tuples concurrently.
+        @return (receipt, logs) or the raised exception for each call, in order.
+        """
+        return await asyncio.gather(
+            *(self.submit(handler, *args, sender=sender, events=events) for handler, args, sender, events in calls),
+            return_exceptions=True,
+        )
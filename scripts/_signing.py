@@ -0,0 +1,169 @@
+"""
+EIP-712 permit and lend offer signing shared by the scripts.
+
+The permit type hashes are constants and each contract's domain separator is
+computed once, checked against the contract's DOMAIN_SEPARATOR, and reused, so
+signing a permit only hashes the permit struct itself.
+"""
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from eth_abi import encode
+from eth_account import Account
+from eth_account.messages import SignableMessage
+from eth_utils import keccak
+
+from scripts._nonces import PermitNonces
+
+TOKEN_DOMAIN_NAME = "TokenTest"
+NFT_DOMAIN_NAME = "Owner NFT"
+PAWN_DOMAIN_NAME = "NiftyPawn"
+DOMAIN_VERSION = "1.0"
+
+DOMAIN_TYPE_HASH = keccak(text="EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)")
+TOKEN_PERMIT_TYPE_HASH = keccak(text="Permit(address owner,address spender,uint256 value,uint256 nonce,uint256 deadline)")
+NFT_PERMIT_TYPE_HASH = keccak(text="Permit(address spender,uint256 tokenId,uint256 nonce,uint256 deadline)")
+LEND_OFFER_TYPE_HASH = keccak(text="LendOffer(address lender,address nftVault,uint256 nftId,address currency,uint256 principal,uint256 interest,uint256 durationInSeconds,uint256 salt,uint256 deadline)")
+COLLECTION_OFFER_TYPE_HASH = keccak(text="CollectionOffer(address lender,address nftVault,address currency,uint256 principal,uint256 interest,uint256 durationInSeconds,uint256 maxFills,uint256 salt,uint256 deadline)")
+
+# NiftyPawn.LendOffer and NiftyPawn.CollectionOffer, in struct field order
+LendOffer = namedtuple("LendOffer", "lender nftVault nftId currency principal interest durationInSeconds salt deadline")
+CollectionOffer = namedtuple("CollectionOffer", "lender nftVault currency principal interest durationInSeconds maxFills salt deadline")
+
+# contract type name => EIP-712 domain name
+DOMAIN_NAMES = {
+    "Token": TOKEN_DOMAIN_NAME,
+    "NFT": NFT_DOMAIN_NAME,
+}
+
+# (chain ID, verifying contract) => verified domain separator
+_domain_separators = {}
+
+
+def compute_domain_separator(name, version, chain_id, verifying_contract):
+    return keccak(encode(
+        ["bytes32", "bytes32", "bytes32", "uint256", "address"],
+        [DOMAIN_TYPE_HASH, keccak(text=name), keccak(text=version), chain_id, verifying_contract],
+    ))
+
+def domain_separator(chain, contract, name):
+    """
+    Return the EIP-712 domain separator of `contract`. The first call for a
+    contract compares the locally computed value with the contract's
+    DOMAIN_SEPARATOR and raises if they differ.
+    """
+    key = (chain.chain_id, contract.address)
+    separator = _domain_separators.get(key)
+    if separator is None:
+        separator = compute_domain_separator(name, DOMAIN_VERSION, key[0], contract.address)
+        onchain = bytes(contract.DOMAIN_SEPARATOR())
+        if separator != onchain:
+            raise ValueError(f"domain separator of {contract.address} is {onchain.hex()}, expected {separator.hex()}")
+        _domain_separators[key] = separator
+    return separator
+
+def token_permit_message(domain, owner, spender, value, nonce, deadline):
+    struct_hash = keccak(encode(
+        ["bytes32", "address", "address", "uint256", "uint256", "uint256"],
+        [TOKEN_PERMIT_TYPE_HASH, owner, spender, value, nonce, deadline],
+    ))
+    return SignableMessage(b"\x01", domain, struct_hash)
+
+def nft_permit_message(domain, spender, token_id, nonce, deadline):
+    struct_hash = keccak(encode(
+        ["bytes32", "address", "uint256", "uint256", "uint256"],
+        [NFT_PERMIT_TYPE_HASH, spender, token_id, nonce, deadline],
+    ))
+    return SignableMessage(b"\x01", domain, struct_hash)
+
+def lend_offer_message(domain, offer):
+    struct_hash = keccak(encode(
+        ["bytes32", "address", "address", "uint256", "address", "uint256", "uint256", "uint256", "uint256", "uint256"],
+        [LEND_OFFER_TYPE_HASH, *offer],
+    ))
+    return SignableMessage(b"\x01", domain, struct_hash)
+
+def collection_offer_message(domain, offer):
+    struct_hash = keccak(encode(
+        ["bytes32", "address", "address", "address", "uint256", "uint256", "uint256", "uint256", "uint256", "uint256"],
+        [COLLECTION_OFFER_TYPE_HASH, *offer],
+    ))
+    return SignableMessage(b"\x01", domain, struct_hash)
+
+def offer_message(domain, offer):
+    """
+    Return the signable message of a LendOffer or a CollectionOffer.
+    """
+    if isinstance(offer, CollectionOffer):
+        return collection_offer_message(domain, offer)
+    return lend_offer_message(domain, LendOffer(*offer))
+
+def offer_hash(domain, offer):
+    """
+    Return the EIP-712 digest of a LendOffer or a CollectionOffer, which
+    NiftyPawn uses as the offer's key in `offerFills` and its events.
+    """
+    message = offer_message(domain, offer)
+    return keccak(b"\x19" + message.version + message.header + message.body)
+
+def getTokenPermit(chain, token, owner, spender, amount, deadline, nonces=None):
+    """
+    Sign a Token permit. Pass a PermitNonces for `token` as `nonces` to take
+    the nonce from it instead of calling `token.nonces`.
+    """
+    domain = domain_separator(chain, token, TOKEN_DOMAIN_NAME)
+    nonce = nonces.next(owner.address) if nonces else token.nonces(owner)
+    message = token_permit_message(domain, owner.address, spender.address, amount, nonce, deadline)
+    return owner.sign_message(message).encode_rsv()
+
+def getNFTPermit(chain, nft, owner, spender, nft_id, deadline, nonces=None):
+    """
+    Sign an NFT permit. Pass a PermitNonces for `nft` as `nonces` to take the
+    nonce from it instead of calling `nft.nonces`.
+    """
+    domain = domain_separator(chain, nft, NFT_DOMAIN_NAME)
+    nonce = nonces.next(nft_id) if nonces else nft.nonces(nft_id)
+    message = nft_permit_message(domain, spender.address, nft_id, nonce, deadline)
+    return owner.sign_message(message).encode_rsv()
+
+def _sign_permit_job(job):
+    domain_name, private_key, domain, fields = job
+    if domain_name == TOKEN_DOMAIN_NAME:
+        message = token_permit_message(domain, *fields)
+    else:
+        message = nft_permit_message(domain, *fields)
+    return bytes(Account.sign_message(message, private_key).signature)
+
+def sign_permits_parallel(chain, jobs, nonces=None, processes=None, chunksize=64):
+    """
+    Sign many Token and NFT permits across a process pool.
+
+    Each job is (account, contract, spender, amount or NFT ID, deadline), where
+    `contract` is a Token or an NFT. Nonces are assigned in job order from
+    `nonces` (contract address => PermitNonces), which is created and loaded
+    from the contracts if not given. Accounts must expose `private_key`, as
+    ape's test accounts do.
+    @return The `encode_rsv()` bytes of each permit, in job order.
+    """
+    if nonces is None:
+        nonces = {}
+    payloads = []
+    for account, contract, spender, value, deadline in jobs:
+        domain_name = DOMAIN_NAMES[contract.contract_type.name]
+        domain = domain_separator(chain, contract, domain_name)
+        contract_nonces = nonces.setdefault(contract.address, PermitNonces(contract))
+        if domain_name == TOKEN_DOMAIN_NAME:
+            fields = (account.address, spender.address, value, contract_nonces.next(account.address), deadline)
+        else:
+            fields = (spender.address, value, contract_nonces.next(value), deadline)
+        payloads.append((domain_name, account.private_key, domain, fields))
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(_sign_permit_job, payloads, chunksize=chunksize))
+
+def getLendOffer(chain, pawn, lender, offer):
+    """
+    Sign a LendOffer, or a CollectionOffer passed as one, as `lender`, whose
+    address must be `offer.lender`. Plain tuples are signed as LendOffers.
+    """
+    domain = domain_separator(chain, pawn, PAWN_DOMAIN_NAME)
+    return lender.sign_message(offer_message(domain, offer)).encode_rsv()
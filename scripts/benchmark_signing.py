@@ -0,0 +1,58 @@
+from ape import project
+from ape import chain
+from ape import accounts
+import click
+from ape.cli import network_option, NetworkBoundCommand, ape_cli_context
+from scripts._nonces import PermitNonces
+from scripts._signing import getTokenPermit, sign_permits_parallel
+import time
+
+TOKEN_CONTRACT = "0x3bBF90A454941368B9DCc06581dA11d806217540"
+PAWN_CONTRACT = "0x2F030c52eb0Fb9d60a57533347547707609dD73c"
+
+PERMIT_TIMEOUT = 120 # seconds
+
+
+# default connect to a provider
+def main():
+    pass
+
+
+#perk you can add args unlike main method
+@click.command(cls=NetworkBoundCommand)
+@ape_cli_context()
+@network_option()
+@click.option("--count", default=2000, help="Number of permits to sign")
+@click.option("--processes", default=None, type=int, help="Worker processes (defaults to the CPU count)")
+# cli_ctx must go first
+def cli(cli_ctx, network, count, processes):
+    """
+    Compare serial and process-pool permit signing throughput
+    """
+    token = project.Token.at(TOKEN_CONTRACT)
+    pawn = project.NiftyPawn.at(PAWN_CONTRACT)
+    signers = list(accounts.test_accounts)
+    deadline = PERMIT_TIMEOUT + chain.pending_timestamp
+    jobs = [(signers[i % len(signers)], token, pawn, 1000 + i, deadline) for i in range(count)]
+
+    # preload nonces so neither path pays for nonces() calls
+    serial_nonces = PermitNonces(token)
+    serial_nonces.load(signer.address for signer in signers)
+    parallel_nonces = {token.address: PermitNonces(token)}
+    parallel_nonces[token.address].load(signer.address for signer in signers)
+
+    start = time.perf_counter()
+    serial = [
+        getTokenPermit(chain, token, owner, spender, amount, job_deadline, nonces=serial_nonces)
+        for owner, _, spender, amount, job_deadline in jobs
+    ]
+    serial_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parallel = sign_permits_parallel(chain, jobs, nonces=parallel_nonces, processes=processes)
+    parallel_time = time.perf_counter() - start
+
+    assert [bytes(sig) for sig in serial] == parallel, "parallel signatures differ from serial ones"
+    print(f"serial:   {count} permits in {serial_time:.2f}s ({count / serial_time:.0f}/s)")
+    print(f"parallel: {count} permits in {parallel_time:.2f}s ({count / parallel_time:.0f}/s)")
+    print(f"speedup:  {serial_time / parallel_time:.1f}x")
@@ -11,6 +11,7 @@ def main():
     account.deploy(project.NFT, gas_limit=0, gas_price=1, max_fee="0 gwei", max_priority_fee="0 gwei")
     account.deploy(project.Token, gas_limit=0, gas_price=1, max_fee="0 gwei", max_priority_fee="0 gwei")
     account.deploy(project.NiftyPawn, gas_limit=0, gas_price=1, max_fee="0 gwei", max_priority_fee="0 gwei")
+    account.deploy(project.Multicall, gas_limit=0, gas_price=1, max_fee="0 gwei", max_priority_fee="0 gwei")
 
 
 #perk you can add args unlike main method
@@ -31,3 +32,4 @@ def cli(cli_ctx, network):
     account.deploy(project.NFT, gas_limit=100000000, gas_price=0, max_fee="0 gwei", max_priority_fee="0 gwei")
     account.deploy(project.Token, gas_limit=100000000, gas_price=0, max_fee="0 gwei", max_priority_fee="0 gwei")
     account.deploy(project.NiftyPawn, gas_limit=100000000, gas_price=0, max_fee="0 gwei", max_priority_fee="0 gwei")
+    account.deploy(project.Multicall, gas_limit=100000000, gas_price=0, max_fee="0 gwei", max_priority_fee="0 gwei")
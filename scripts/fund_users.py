@@ -3,9 +3,27 @@ from ape.cli import get_user_selected_account
 import click
 from ape.cli import network_option, NetworkBoundCommand, ape_cli_context
 from ape.api.networks import LOCAL_NETWORK_NAME
+import csv
+from pathlib import Path
 
 TOKEN_CONTRACT = "0x3bBF90A454941368B9DCc06581dA11d806217540"
 
+MAX_BATCH = 500 # Token.MAX_BATCH
+DEFAULT_AMOUNT = 1000000
+
+
+def read_funding_csv(path):
+    """
+    Read (address, amount) rows from a CSV with an `address,amount` header.
+    """
+    with open(path, newline="") as f:
+        return [(row["address"].strip(), int(row["amount"])) for row in csv.DictReader(f)]
+
+def read_checkpoint(path):
+    return int(path.read_text()) if path.exists() else 0
+
+def write_checkpoint(path, rows_done):
+    path.write_text(str(rows_done))
 
 
 # default connect to a provider
@@ -17,16 +35,42 @@ def main():
 @click.command(cls=NetworkBoundCommand)
 @ape_cli_context()
 @network_option()
+@click.option("--csv", "csv_path", default=None, help="CSV of address,amount rows to fund")
+@click.option("--batch-size", default=200, help="Receivers per transaction")
+@click.option("--checkpoint", "checkpoint_path", default=None, help="File tracking funded rows (defaults to <csv>.checkpoint)")
+@click.option("--mint", is_flag=True, help="Mint the amounts instead of transferring them from the broker")
 # cli_ctx must go first
-def cli(cli_ctx, network):
+def cli(cli_ctx, network, csv_path, batch_size, checkpoint_path, mint):
     """
-    Deploy all contracts
+    Fund accounts with tokens in batches
+
+    Without --csv the selected borrower and lender each receive 1000000 tokens.
+    With --csv every row is funded in batches, and the number of funded rows is
+    written to the checkpoint file after each batch so an interrupted run
+    resumes where it stopped.
     """
-    borrower = get_user_selected_account("Select borrower")
-    lender = get_user_selected_account("Select lender")
+    if csv_path is None:
+        borrower = get_user_selected_account("Select borrower")
+        lender = get_user_selected_account("Select lender")
+        rows = [(borrower.address, DEFAULT_AMOUNT), (lender.address, DEFAULT_AMOUNT)]
+        checkpoint = None
+    else:
+        rows = read_funding_csv(csv_path)
+        checkpoint = Path(checkpoint_path or f"{csv_path}.checkpoint")
     broker = get_user_selected_account("Select broker")
     token = project.Token.at(TOKEN_CONTRACT)
-    
-    token.transfer(borrower, 1000000, sender=broker, gas_limit=100000000, gas_price=0, max_fee="0 gwei", max_priority_fee="0 gwei")
-    token.transfer(lender, 1000000, sender=broker, gas_limit=100000000, gas_price=0, max_fee="0 gwei", max_priority_fee="0 gwei")
-    assert(token.balanceOf(borrower) == token.balanceOf(lender) == 1000000)
+    fund = token.mintBatch if mint else token.transferBatch
+    batch_size = min(batch_size, MAX_BATCH)
+
+    done = read_checkpoint(checkpoint) if checkpoint else 0
+    if done:
+        print(f"resuming after {done} funded rows")
+    while done < len(rows):
+        batch = rows[done:done + batch_size]
+        receivers = [address for address, _ in batch]
+        amounts = [amount for _, amount in batch]
+        fund(receivers, amounts, sender=broker, gas_limit=100000000, gas_price=0, max_fee="0 gwei", max_priority_fee="0 gwei")
+        done += len(batch)
+        if checkpoint:
+            write_checkpoint(checkpoint, done)
+        print(f"funded {done}/{len(rows)} accounts")
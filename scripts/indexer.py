@@ -0,0 +1,302 @@
+from ape import project
+from ape import chain
+import click
+from ape.cli import network_option, NetworkBoundCommand, ape_cli_context
+import sqlite3
+import time
+
+NFT_CONTRACT = "0xCf149676e251d37C1925c4993ac43F0E064AeBAB"
+TOKEN_CONTRACT = "0x3bBF90A454941368B9DCc06581dA11d806217540"
+PAWN_CONTRACT = "0x2F030c52eb0Fb9d60a57533347547707609dD73c"
+
+CHUNK_SIZE = 2000 # blocks per log query
+REORG_DEPTH = 12 # blocks to roll back when the checkpoint block was reorged out
+POLL_INTERVAL = 5 # seconds
+
+PAWN_EVENTS = ("PawnCreated", "PawnStarted", "PawnRefinanced", "PawnRepaid", "PawnDefaultClaimed", "PawnCanceled")
+
+# events after which the pawn has a (new) lender and start timestamp
+FUNDING_EVENTS = ("PawnStarted", "PawnRefinanced")
+
+# state a pawn is left in by each event
+EVENT_STATES = {
+    "PawnCreated": "CREATED",
+    "PawnStarted": "ACTIVE",
+    "PawnRefinanced": "ACTIVE",
+    "PawnRepaid": "REPAID",
+    "PawnDefaultClaimed": "DEFAULTED",
+    "PawnCanceled": "CANCELED",
+}
+
+# Token amounts and IDs are uint256, so they are stored as decimal text.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoint (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    block_number INTEGER NOT NULL,
+    block_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pawn_events (
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    transaction_hash TEXT NOT NULL,
+    event TEXT NOT NULL,
+    pawn_id INTEGER NOT NULL,
+    lender TEXT,
+    start_timestamp INTEGER,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS pawn_events_pawn_id ON pawn_events (pawn_id);
+CREATE TABLE IF NOT EXISTS pawns (
+    pawn_id INTEGER PRIMARY KEY,
+    nft_vault TEXT,
+    nft_id TEXT,
+    currency TEXT,
+    principal TEXT,
+    interest TEXT,
+    duration INTEGER,
+    borrower TEXT,
+    lender TEXT,
+    state TEXT NOT NULL,
+    start_timestamp INTEGER,
+    created_block INTEGER NOT NULL,
+    updated_block INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pawns_borrower ON pawns (borrower);
+CREATE INDEX IF NOT EXISTS pawns_lender ON pawns (lender);
+CREATE INDEX IF NOT EXISTS pawns_state ON pawns (state);
+CREATE INDEX IF NOT EXISTS pawns_currency ON pawns (currency);
+CREATE TABLE IF NOT EXISTS transfers (
+    contract TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    transaction_hash TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    receiver TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS transfers_sender ON transfers (contract, sender);
+CREATE INDEX IF NOT EXISTS transfers_receiver ON transfers (contract, receiver);
+"""
+
+
+class PawnIndexer:
+    """
+    Mirrors NiftyPawn, NFT and Token logs into a local SQLite database.
+
+    Logs are fetched in CHUNK_SIZE block ranges and the last processed block is
+    checkpointed after every chunk, so an interrupted run resumes where it left
+    off. If the checkpointed block hash no longer matches the chain, the last
+    `reorg_depth` blocks are discarded and indexed again.
+
+    Pawn terms are read with `idToData` at the block of the PawnCreated,
+    PawnStarted and PawnRefinanced logs, since canceled pawns are cleared from
+    contract storage and a refinance replaces the lender and loan terms.
+    """
+
+    def __init__(self, db_path, pawn, nft, token, start_block=0, chunk_size=CHUNK_SIZE, reorg_depth=REORG_DEPTH):
+        self.db = sqlite3.connect(db_path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+        self.pawn = pawn
+        self.nft = nft
+        self.token = token
+        self.start_block = start_block
+        self.chunk_size = chunk_size
+        self.reorg_depth = reorg_depth
+
+    def checkpoint(self):
+        row = self.db.execute("SELECT block_number, block_hash FROM checkpoint WHERE id = 0").fetchone()
+        return (row["block_number"], row["block_hash"]) if row else None
+
+    def _set_checkpoint(self, block_number):
+        block_hash = chain.blocks[block_number].hash.hex()
+        self.db.execute(
+            "INSERT OR REPLACE INTO checkpoint (id, block_number, block_hash) VALUES (0, ?, ?)",
+            (block_number, block_hash),
+        )
+
+    def sync(self):
+        """
+        Index every block from the checkpoint up to the current head.
+        @return The number of the last indexed block.
+        """
+        checkpoint = self.checkpoint()
+        if checkpoint is not None:
+            block_number, block_hash = checkpoint
+            if chain.blocks[block_number].hash.hex() != block_hash:
+                self.rollback(max(block_number - self.reorg_depth, self.start_block - 1))
+                checkpoint = self.checkpoint()
+
+        start = checkpoint[0] + 1 if checkpoint else self.start_block
+        head = chain.blocks.head.number
+        while start <= head:
+            stop = min(start + self.chunk_size, head + 1)
+            with self.db:
+                self._index_range(start, stop)
+                self._set_checkpoint(stop - 1)
+            start = stop
+        return head
+
+    def follow(self, poll_interval=POLL_INTERVAL):
+        while True:
+            head = self.sync()
+            print(f"Indexed through block {head}")
+            time.sleep(poll_interval)
+
+    def _index_range(self, start, stop):
+        pawn_logs = []
+        for name in PAWN_EVENTS:
+            pawn_logs.extend(getattr(self.pawn, name).range(start, stop))
+        for log in sorted(pawn_logs, key=lambda log: (log.block_number, log.log_index)):
+            self._apply_pawn_log(log)
+
+        for contract, field in ((self.nft, "tokenId"), (self.token, "amount")):
+            self.db.executemany(
+                "INSERT OR REPLACE INTO transfers VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        contract.address,
+                        log.block_number,
+                        log.log_index,
+                        log.transaction_hash,
+                        log.sender,
+                        log.receiver,
+                        str(getattr(log, field)),
+                    )
+                    for log in contract.Transfer.range(start, stop)
+                ],
+            )
+
+    def _apply_pawn_log(self, log):
+        pawn_id = log.pawnId
+        lender = start_timestamp = None
+        if log.event_name == "PawnCreated":
+            data = self.pawn.idToData(pawn_id, block_identifier=log.block_number)
+            self.db.execute(
+                """
+                INSERT OR REPLACE INTO pawns
+                (pawn_id, nft_vault, nft_id, currency, principal, interest, duration, borrower, state, created_block, updated_block)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    pawn_id,
+                    data.terms.nftVault,
+                    str(data.terms.nftId),
+                    data.terms.currency,
+                    str(data.terms.principal),
+                    str(data.terms.interest),
+                    data.terms.durationInSeconds,
+                    data.borrower,
+                    EVENT_STATES[log.event_name],
+                    log.block_number,
+                    log.block_number,
+                ),
+            )
+        elif log.event_name in FUNDING_EVENTS:
+            data = self.pawn.idToData(pawn_id, block_identifier=log.block_number)
+            lender, start_timestamp = data.lender, data.startTimestamp
+            self._update_funding(pawn_id, EVENT_STATES[log.event_name], data, log.block_number)
+        else:
+            self.db.execute(
+                "UPDATE pawns SET state = ?, updated_block = ? WHERE pawn_id = ?",
+                (EVENT_STATES[log.event_name], log.block_number, pawn_id),
+            )
+
+        self.db.execute(
+            "INSERT OR REPLACE INTO pawn_events VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (log.block_number, log.log_index, log.transaction_hash, log.event_name, pawn_id, lender, start_timestamp),
+        )
+
+    def _update_funding(self, pawn_id, state, data, block_number):
+        self.db.execute(
+            """
+            UPDATE pawns SET state = ?, lender = ?, start_timestamp = ?, principal = ?, interest = ?, duration = ?, updated_block = ?
+            WHERE pawn_id = ?
+            """,
+            (
+                state,
+                data.lender,
+                data.startTimestamp,
+                str(data.terms.principal),
+                str(data.terms.interest),
+                data.terms.durationInSeconds,
+                block_number,
+                pawn_id,
+            ),
+        )
+
+    def rollback(self, block_number):
+        """
+        Forget everything indexed after `block_number` and rewind the pawns
+        touched since then to their last remaining event.
+        """
+        with self.db:
+            self.db.execute("DELETE FROM pawn_events WHERE block_number > ?", (block_number,))
+            self.db.execute("DELETE FROM transfers WHERE block_number > ?", (block_number,))
+            self.db.execute("DELETE FROM pawns WHERE created_block > ?", (block_number,))
+            stale = self.db.execute("SELECT pawn_id FROM pawns WHERE updated_block > ?", (block_number,)).fetchall()
+            for row in stale:
+                self._rewind_pawn(row["pawn_id"])
+            if block_number < self.start_block:
+                self.db.execute("DELETE FROM checkpoint")
+            else:
+                self._set_checkpoint(block_number)
+
+    def _rewind_pawn(self, pawn_id):
+        events = self.db.execute(
+            "SELECT * FROM pawn_events WHERE pawn_id = ? ORDER BY block_number, log_index", (pawn_id,)
+        ).fetchall()
+        funded = [event for event in events if event["event"] in FUNDING_EVENTS]
+        last = events[-1]
+        if funded:
+            # a rolled back refinance also changed the terms, so re-read them
+            data = self.pawn.idToData(pawn_id, block_identifier=funded[-1]["block_number"])
+            self._update_funding(pawn_id, EVENT_STATES[last["event"]], data, last["block_number"])
+            return
+        self.db.execute(
+            "UPDATE pawns SET state = ?, lender = NULL, start_timestamp = NULL, updated_block = ? WHERE pawn_id = ?",
+            (EVENT_STATES[last["event"]], last["block_number"], pawn_id),
+        )
+
+    def _pawns_where(self, column, value):
+        return [dict(row) for row in self.db.execute(f"SELECT * FROM pawns WHERE {column} = ? ORDER BY pawn_id", (value,))]
+
+    def loans_by_borrower(self, borrower):
+        return self._pawns_where("borrower", str(borrower))
+
+    def loans_by_lender(self, lender):
+        return self._pawns_where("lender", str(lender))
+
+    def loans_by_state(self, state):
+        return self._pawns_where("state", state)
+
+    def loans_by_currency(self, currency):
+        return self._pawns_where("currency", str(currency))
+
+
+# default connect to a provider
+def main():
+    pass
+
+
+#perk you can add args unlike main method
+@click.command(cls=NetworkBoundCommand)
+@ape_cli_context()
+@network_option()
+@click.option("--db", "db_path", default="pawns.db", help="SQLite database to write to")
+@click.option("--start-block", default=0, help="First block to index on a fresh database")
+@click.option("--follow", is_flag=True, help="Keep indexing new blocks")
+# cli_ctx must go first
+def cli(cli_ctx, network, db_path, start_block, follow):
+    """
+    Index NiftyPawn, NFT and Token logs into a local SQLite database
+    """
+    pawn = project.NiftyPawn.at(PAWN_CONTRACT)
+    nft = project.NFT.at(NFT_CONTRACT)
+    token = project.Token.at(TOKEN_CONTRACT)
+    indexer = PawnIndexer(db_path, pawn, nft, token, start_block=start_block)
+    if follow:
+        indexer.follow()
+    else:
+        print(f"Indexed through block {indexer.sync()}")
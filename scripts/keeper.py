@@ -0,0 +1,137 @@
+from ape import project
+from ape import chain
+from ape import accounts
+from ape.cli import get_user_selected_account
+from ape.exceptions import ContractLogicError
+import click
+from ape.cli import network_option, NetworkBoundCommand, ape_cli_context
+import heapq
+import time
+
+PAWN_CONTRACT = "0x2F030c52eb0Fb9d60a57533347547707609dD73c"
+
+PAGE_SIZE = 100 # NiftyPawn.MAX_PAGE_SIZE
+POLL_INTERVAL = 5 # seconds
+
+
+class DefaultKeeper:
+    """
+    Claims defaulted pawns on behalf of a set of lenders.
+
+    Active pawns funded by a managed lender are kept in a min-heap keyed by
+    their expiry (startTimestamp + durationInSeconds). The heap is seeded from
+    the contract's active set and kept current from PawnStarted,
+    PawnRefinanced, PawnRepaid and PawnDefaultClaimed logs, so the keeper only
+    sleeps until the next expiry instead of polling every pawn. A refinanced
+    pawn is re-tracked with its new expiry, or dropped if it moved to a lender
+    the keeper does not manage. Entries for pawns that left the active set or
+    changed expiry are dropped lazily when they reach the top of the heap. A
+    claim that fails to send, rather than reverting, stays tracked and is
+    retried on the next round.
+    """
+
+    def __init__(self, pawn, lenders, poll_interval=POLL_INTERVAL):
+        self.pawn = pawn
+        self.lenders = {lender.address: lender for lender in lenders}
+        self.poll_interval = poll_interval
+        self.heap = []
+        # pawnId => (expiry, lender address) of the pawns currently tracked
+        self.tracked = {}
+        self.last_block = None
+
+    def track(self, pawn_id, data):
+        if data.lender not in self.lenders:
+            return
+        expiry = data.startTimestamp + data.terms.durationInSeconds
+        self.tracked[pawn_id] = (expiry, data.lender)
+        heapq.heappush(self.heap, (expiry, pawn_id))
+
+    def untrack(self, pawn_id):
+        self.tracked.pop(pawn_id, None)
+
+    def seed(self):
+        self.last_block = chain.blocks.head.number
+        start = 0
+        while True:
+            entries = self.pawn.activePawns(start, PAGE_SIZE)
+            for entry in entries:
+                self.track(entry.pawnId, entry.data)
+            if len(entries) < PAGE_SIZE:
+                break
+            start += PAGE_SIZE
+        print(f"Tracking {len(self.tracked)} active pawns as of block {self.last_block}")
+
+    def sync(self):
+        head = chain.blocks.head.number
+        if head <= self.last_block:
+            return
+        start, stop = self.last_block + 1, head + 1
+        for log in self.pawn.PawnStarted.range(start, stop):
+            self.track(log.pawnId, self.pawn.idToData(log.pawnId))
+        for log in self.pawn.PawnRefinanced.range(start, stop):
+            self.untrack(log.pawnId)
+            self.track(log.pawnId, self.pawn.idToData(log.pawnId))
+        for log in self.pawn.PawnRepaid.range(start, stop):
+            self.untrack(log.pawnId)
+        for log in self.pawn.PawnDefaultClaimed.range(start, stop):
+            self.untrack(log.pawnId)
+        self.last_block = head
+
+    def next_expiry(self):
+        # discard entries whose pawn was repaid or claimed since being pushed
+        while self.heap and self.tracked.get(self.heap[0][1], (None,))[0] != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def claim_due(self, now):
+        while (expiry := self.next_expiry()) is not None and expiry <= now:
+            _, pawn_id = heapq.heappop(self.heap)
+            lender = self.lenders[self.tracked[pawn_id][1]]
+            try:
+                tx = self.pawn.claimDefaulted(pawn_id, sender=lender, gas_limit=100000000, gas_price=0, max_fee="0 gwei", max_priority_fee="0 gwei")
+            except ContractLogicError as err:
+                self.untrack(pawn_id)
+                print(f"Claim of pawn {pawn_id} reverted: {err}")
+                continue
+            except Exception as err:
+                # provider or network failure: keep the pawn and retry on the next round
+                heapq.heappush(self.heap, (expiry, pawn_id))
+                print(f"Claim of pawn {pawn_id} not sent, retrying later: {err}")
+                break
+            self.untrack(pawn_id)
+            print(f"Claimed pawn {pawn_id} for lender {lender.address} in tx {tx.txn_hash}")
+
+    def run(self):
+        self.seed()
+        while True:
+            self.sync()
+            now = chain.blocks.head.timestamp
+            self.claim_due(now)
+            expiry = self.next_expiry()
+            delay = self.poll_interval if expiry is None else min(self.poll_interval, expiry - now)
+            time.sleep(max(delay, 1))
+
+
+# default connect to a provider
+def main():
+    pass
+
+
+#perk you can add args unlike main method
+@click.command(cls=NetworkBoundCommand)
+@ape_cli_context()
+@network_option()
+@click.option("--lender", "lender_aliases", multiple=True, help="Alias of a lender account to claim for (repeatable)")
+@click.option("--poll-interval", default=POLL_INTERVAL, help="Maximum seconds between log polls")
+# cli_ctx must go first
+def cli(cli_ctx, network, lender_aliases, poll_interval):
+    """
+    Claim defaulted pawns for the selected lenders as they expire
+    """
+    if lender_aliases:
+        lenders = [accounts.load(alias) for alias in lender_aliases]
+    else:
+        lenders = [get_user_selected_account("Select lender")]
+    pawn = project.NiftyPawn.at(PAWN_CONTRACT)
+
+    DefaultKeeper(pawn, lenders, poll_interval).run()
@@ -0,0 +1,315 @@
+from ape import project
+from ape import chain
+from ape import accounts
+from ape.cli import get_user_selected_account
+import click
+from ape.cli import network_option, NetworkBoundCommand, ape_cli_context
+from scripts._pipeline import TransactionPipeline
+from scripts._signing import getNFTPermit
+from collections import Counter, defaultdict
+import asyncio
+import math
+import random
+import statistics
+import time
+
+NFT_CONTRACT = "0xCf149676e251d37C1925c4993ac43F0E064AeBAB"
+TOKEN_CONTRACT = "0x3bBF90A454941368B9DCc06581dA11d806217540"
+PAWN_CONTRACT = "0x2F030c52eb0Fb9d60a57533347547707609dD73c"
+
+MAX_BATCH = 500 # NFT.MAX_BATCH and Token.MAX_BATCH
+MAX_UINT256 = 2 ** 256 - 1
+PERMIT_TIMEOUT = 120 # seconds
+REPAY_MARGIN = 5 # seconds before expiry after which a loan is left to default
+
+OPERATIONS = ("create", "accept", "repay", "default", "cancel")
+DEFAULT_MIX = "create=4,accept=3,repay=2,default=1,cancel=1"
+TX_KWARGS = dict(gas_limit=100000000, gas_price=0, max_fee="0 gwei", max_priority_fee="0 gwei")
+
+
+def parse_mix(text):
+    """
+    Parse `op=weight,...` into a dict of operation => relative weight.
+    """
+    mix = {}
+    for item in text.split(","):
+        operation, _, weight = item.partition("=")
+        operation = operation.strip()
+        if operation not in OPERATIONS:
+            raise click.BadParameter(f"unknown operation {operation!r}, expected one of {', '.join(OPERATIONS)}")
+        mix[operation] = float(weight)
+    return mix
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+def failure_reason(err):
+    message = str(err).strip().splitlines()
+    return f"{type(err).__name__}: {message[0][:120]}" if message else type(err).__name__
+
+
+class LoadGenerator:
+    """
+    Drives a Poisson stream of pawn operations against a deployed NiftyPawn.
+
+    Arrivals are spaced by exponential gaps with mean 1 / `tps`, and each
+    arrival picks an operation from `mix` by weight. An operation takes the
+    pawn or NFT it works on out of the generator's pools before sending, so
+    concurrent operations never touch the same loan; when no loan is in the
+    right state the arrival is counted as skipped. Transactions go through a
+    TransactionPipeline, so many are in flight at once.
+
+    Lenders and borrowers grant the pawn a standing token allowance during
+    setup and pass empty permit signatures, which keeps token permit nonces
+    out of the way of concurrent submission. NFT permits are signed per
+    listing, since an NFT is only ever used by one operation at a time.
+    """
+
+    def __init__(self, pawn, nft, token, broker, borrowers, lenders, mix, tps, loan_duration, rng=None):
+        self.pawn = pawn
+        self.nft = nft
+        self.token = token
+        self.broker = broker
+        self.borrowers = borrowers
+        self.lenders = lenders
+        self.mix = mix
+        self.tps = tps
+        self.loan_duration = loan_duration
+        self.rng = rng or random.Random()
+        self.pipeline = TransactionPipeline(**TX_KWARGS)
+        # borrower address => NFT IDs held and not listed
+        self.free_nfts = {borrower.address: [] for borrower in borrowers}
+        # loans awaiting a lender and active loans, as dicts
+        self.created = []
+        self.active = []
+        self.sent = Counter()
+        self.skipped = Counter()
+        self.failures = Counter()
+        self.latencies = defaultdict(list)
+        self.gas = defaultdict(list)
+
+    @property
+    def participants(self):
+        return self.borrowers + self.lenders
+
+    def mint_collateral(self, nfts_per_borrower):
+        for borrower in self.borrowers:
+            minted = 0
+            while minted < nfts_per_borrower:
+                size = min(MAX_BATCH, nfts_per_borrower - minted)
+                first_id = self.nft.totalSupply()
+                self.nft.mintBatch(borrower, size, sender=self.broker, **TX_KWARGS)
+                self.free_nfts[borrower.address].extend(range(first_id, first_id + size))
+                minted += size
+        print(f"minted {nfts_per_borrower} NFTs to each of {len(self.borrowers)} borrowers")
+
+    def fund(self, amount):
+        participants = self.participants
+        for start in range(0, len(participants), MAX_BATCH):
+            batch = participants[start:start + MAX_BATCH]
+            self.token.mintBatch(batch, [amount] * len(batch), sender=self.broker, **TX_KWARGS)
+        print(f"funded {len(participants)} accounts with {amount} tokens")
+
+    async def approve(self):
+        results = await self.pipeline.submit_all(
+            [(self.token.approve, (self.pawn.address, MAX_UINT256), account, ()) for account in self.participants]
+        )
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            raise errors[0]
+
+    async def _now(self):
+        return await asyncio.to_thread(lambda: chain.blocks.head.timestamp)
+
+    async def _send(self, operation, handler, *args, sender, events=()):
+        """
+        Submit one operation's transaction and record its latency and gas.
+        @return (receipt, logs), or None if it failed.
+        """
+        self.sent[operation] += 1
+        start = time.monotonic()
+        try:
+            receipt, logs = await self.pipeline.submit(handler, *args, sender=sender, events=events)
+        except Exception as err:
+            self.failures[(operation, failure_reason(err))] += 1
+            return None
+        if receipt.failed:
+            self.failures[(operation, "reverted")] += 1
+            return None
+        self.latencies[operation].append(time.monotonic() - start)
+        self.gas[operation].append(receipt.gas_used)
+        return receipt, logs
+
+    def _take(self, pool, candidates=None):
+        indexes = range(len(pool)) if candidates is None else candidates
+        if not indexes:
+            return None
+        return pool.pop(self.rng.choice(indexes))
+
+    async def create(self):
+        holders = [borrower for borrower in self.borrowers if self.free_nfts[borrower.address]]
+        if not holders:
+            return False
+        borrower = self.rng.choice(holders)
+        nft_id = self.free_nfts[borrower.address].pop()
+        deadline = await self._now() + PERMIT_TIMEOUT
+        permit = await asyncio.to_thread(getNFTPermit, chain, self.nft, borrower, self.pawn, nft_id, deadline)
+        principal = self.rng.randint(100, 10000)
+        terms = (self.nft.address, nft_id, self.token.address, principal, principal // 100, self.loan_duration)
+        result = await self._send("create", self.pawn.createTermsWithCollateral, terms, deadline, permit, sender=borrower, events=[self.pawn.PawnCreated])
+        if result is None:
+            self.free_nfts[borrower.address].append(nft_id)
+        else:
+            pawn_id = result[1]["PawnCreated"][0].pawnId
+            self.created.append({"pawn_id": pawn_id, "nft_id": nft_id, "borrower": borrower})
+        return True
+
+    async def accept(self):
+        loan = self._take(self.created)
+        if loan is None:
+            return False
+        lender = self.rng.choice(self.lenders)
+        result = await self._send("accept", self.pawn.acceptTermsAndFund, loan["pawn_id"], 0, b"", sender=lender, events=[self.pawn.PawnStarted])
+        if result is None:
+            self.created.append(loan)
+        else:
+            started = await asyncio.to_thread(lambda: chain.blocks[result[0].block_number].timestamp)
+            self.active.append({**loan, "lender": lender, "expiry": started + self.loan_duration})
+        return True
+
+    async def repay(self):
+        now = await self._now()
+        loan = self._take(self.active, [i for i, loan in enumerate(self.active) if loan["expiry"] > now + REPAY_MARGIN])
+        if loan is None:
+            return False
+        result = await self._send("repay", self.pawn.repay, loan["pawn_id"], 0, b"", sender=loan["borrower"])
+        if result is None:
+            self.active.append(loan)
+        else:
+            self.free_nfts[loan["borrower"].address].append(loan["nft_id"])
+        return True
+
+    async def default(self):
+        now = await self._now()
+        loan = self._take(self.active, [i for i, loan in enumerate(self.active) if loan["expiry"] < now])
+        if loan is None:
+            return False
+        # the NFT goes to the lender and leaves the pool
+        if await self._send("default", self.pawn.claimDefaulted, loan["pawn_id"], sender=loan["lender"]) is None:
+            self.active.append(loan)
+        return True
+
+    async def cancel(self):
+        loan = self._take(self.created)
+        if loan is None:
+            return False
+        if await self._send("cancel", self.pawn.cancelTerms, loan["pawn_id"], sender=loan["borrower"]) is None:
+            self.created.append(loan)
+        else:
+            self.free_nfts[loan["borrower"].address].append(loan["nft_id"])
+        return True
+
+    async def _arrival(self, operation):
+        if not await getattr(self, operation)():
+            self.skipped[operation] += 1
+
+    async def run(self, seconds):
+        """
+        Approve the pawn for every participant, then generate load for
+        `seconds` and wait for the transactions still in flight.
+        @return (elapsed seconds, first block, last block) of the load phase.
+        """
+        await self.approve()
+        first_block = await asyncio.to_thread(lambda: chain.blocks.head.number + 1)
+        operations = list(self.mix)
+        weights = [self.mix[operation] for operation in operations]
+        tasks = []
+        started = time.monotonic()
+        next_at = started
+        while True:
+            next_at += self.rng.expovariate(self.tps)
+            if next_at - started > seconds:
+                break
+            await asyncio.sleep(max(0, next_at - time.monotonic()))
+            operation = self.rng.choices(operations, weights)[0]
+            tasks.append(asyncio.create_task(self._arrival(operation)))
+        await asyncio.gather(*tasks)
+        elapsed = time.monotonic() - started
+        last_block = await asyncio.to_thread(lambda: chain.blocks.head.number)
+        return elapsed, first_block, last_block
+
+    def report(self, elapsed, first_block, last_block):
+        completed = sum(len(samples) for samples in self.latencies.values())
+        print(f"\n{completed} transactions confirmed in {elapsed:.1f}s: {completed / elapsed:.1f} tx/s (target {self.tps} arrivals/s)")
+
+        print(f"\n{'operation':<10}{'sent':>7}{'ok':>7}{'failed':>8}{'skipped':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'gas p50':>10}")
+        for operation in OPERATIONS:
+            latencies = self.latencies[operation]
+            failed = sum(count for (op, _), count in self.failures.items() if op == operation)
+            if latencies:
+                timing = "".join(f"{percentile(latencies, pct) * 1000:>9.0f}" for pct in (50, 90, 99))
+                gas = f"{statistics.median(self.gas[operation]):>10.0f}"
+            else:
+                timing, gas = f"{'-':>9}" * 3, f"{'-':>10}"
+            print(f"{operation:<10}{self.sent[operation]:>7}{len(latencies):>7}{failed:>8}{self.skipped[operation]:>9}{timing}{gas}")
+
+        if last_block >= first_block:
+            blocks = [chain.blocks[number] for number in range(first_block, last_block + 1)]
+            gas_used = [block.gas_used for block in blocks]
+            tx_counts = [block.num_transactions for block in blocks]
+            print(
+                f"\n{len(blocks)} blocks: gas per block mean {statistics.mean(gas_used):.0f}, "
+                f"p90 {percentile(gas_used, 90)}, max {max(gas_used)}; "
+                f"txs per block mean {statistics.mean(tx_counts):.1f}, max {max(tx_counts)}"
+            )
+
+        if self.failures:
+            print("\nfailures:")
+            for (operation, reason), count in self.failures.most_common():
+                print(f"{count:>7}  {operation}: {reason}")
+
+
+# default connect to a provider
+def main():
+    pass
+
+
+#perk you can add args unlike main method
+@click.command(cls=NetworkBoundCommand)
+@ape_cli_context()
+@network_option()
+@click.option("--borrowers", default=4, help="Number of borrower accounts")
+@click.option("--lenders", default=4, help="Number of lender accounts")
+@click.option("--nfts-per-borrower", default=50, help="Collateral NFTs minted to each borrower")
+@click.option("--funding", default=10 ** 9, help="Tokens minted to each borrower and lender")
+@click.option("--tps", default=5.0, help="Target operation arrivals per second")
+@click.option("--seconds", default=60.0, help="Length of the load phase")
+@click.option("--mix", "mix_text", default=DEFAULT_MIX, help="Relative weights of create, accept, repay, default and cancel")
+@click.option("--loan-duration", default=30, help="Duration of each loan in seconds")
+@click.option("--seed", default=None, type=int, help="Random seed for a reproducible arrival sequence")
+# cli_ctx must go first
+def cli(cli_ctx, network, borrowers, lenders, nfts_per_borrower, funding, tps, seconds, mix_text, loan_duration, seed):
+    """
+    Simulate a busy lending market and report throughput, latency and gas
+
+    Borrowers and lenders are taken from the test accounts after the broker,
+    which must be allowed to mint NFTs and tokens.
+    """
+    mix = parse_mix(mix_text)
+    broker = get_user_selected_account("Select broker")
+    signers = [account for account in accounts.test_accounts if account.address != broker.address]
+    if borrowers + lenders > len(signers):
+        raise click.BadParameter(f"only {len(signers)} test accounts are available")
+    pawn = project.NiftyPawn.at(PAWN_CONTRACT)
+    nft = project.NFT.at(NFT_CONTRACT)
+    token = project.Token.at(TOKEN_CONTRACT)
+
+    generator = LoadGenerator(
+        pawn, nft, token, broker,
+        signers[:borrowers], signers[borrowers:borrowers + lenders],
+        mix, tps, loan_duration, random.Random(seed),
+    )
+    generator.mint_collateral(nfts_per_borrower)
+    generator.fund(funding)
+    generator.report(*asyncio.run(generator.run(seconds)))
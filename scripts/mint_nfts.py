@@ -0,0 +1,41 @@
+from ape import project
+from ape.cli import get_user_selected_account
+import click
+from ape.cli import network_option, NetworkBoundCommand, ape_cli_context
+
+NFT_CONTRACT = "0xCf149676e251d37C1925c4993ac43F0E064AeBAB"
+
+MAX_BATCH = 500 # NFT.MAX_BATCH
+
+
+# default connect to a provider
+def main():
+    pass
+
+
+#perk you can add args unlike main method
+@click.command(cls=NetworkBoundCommand)
+@ape_cli_context()
+@network_option()
+@click.option("--count", default=1, help="Number of NFTs to mint")
+@click.option("--batch-size", default=MAX_BATCH, help="NFTs minted per transaction")
+# cli_ctx must go first
+def cli(cli_ctx, network, count, batch_size):
+    """
+    Mint many NFTs to the borrower with NFT.mintBatch
+    """
+    borrower = get_user_selected_account("Select borrower")
+    broker = get_user_selected_account("Select broker")
+    nft = project.NFT.at(NFT_CONTRACT)
+    batch_size = min(batch_size, MAX_BATCH)
+
+    first_id = nft.totalSupply()
+    minted = 0
+    while minted < count:
+        size = min(batch_size, count - minted)
+        nft.mintBatch(borrower, size, sender=broker, gas_limit=100000000, gas_price=0, max_fee="0 gwei", max_priority_fee="0 gwei")
+        minted += size
+        print(f"minted {minted}/{count}")
+
+    print(f"minted ids {first_id} to {first_id + count - 1}")
+    print(f"balance of borrower: {nft.balanceOf(borrower)}")
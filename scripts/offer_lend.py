@@ -0,0 +1,70 @@
+from ape import project
+from ape import chain
+from ape.cli import get_user_selected_account
+import click
+from ape.cli import network_option, NetworkBoundCommand, ape_cli_context
+from scripts._orderbook import OrderBook
+from scripts._signing import CollectionOffer, LendOffer, getLendOffer, getTokenPermit, getNFTPermit
+
+NFT_CONTRACT = "0xCf149676e251d37C1925c4993ac43F0E064AeBAB"
+TOKEN_CONTRACT = "0x3bBF90A454941368B9DCc06581dA11d806217540"
+PAWN_CONTRACT = "0x2F030c52eb0Fb9d60a57533347547707609dD73c"
+
+PERMIT_TIMEOUT = 120 # seconds
+OFFER_TIMEOUT = 3600 # seconds
+
+# default connect to a provider
+def main():
+    pass
+
+
+#perk you can add args unlike main method
+@click.command(cls=NetworkBoundCommand)
+@ape_cli_context()
+@network_option()
+@click.option("--nft-id", default=0, help="NFT the borrower pledges")
+@click.option("--max-fills", default=0, help="Also post a collection offer for this many loans")
+# cli_ctx must go first
+def cli(cli_ctx, network, nft_id, max_fills):
+    """
+    Start a loan in one transaction by filling a lender's signed offer
+    """
+    borrower = get_user_selected_account('Select borrower')
+    lender = get_user_selected_account('Select lender')
+    nft = project.NFT.at(NFT_CONTRACT)
+    token = project.Token.at(TOKEN_CONTRACT)
+    pawn = project.NiftyPawn.at(PAWN_CONTRACT)
+    book = OrderBook(chain, pawn)
+
+    # the lender posts two offers off chain
+    deadline = OFFER_TIMEOUT + chain.pending_timestamp
+    for salt, (loan_amount, interest) in enumerate([(1000, 120), (1000, 100)]):
+        offer = LendOffer(lender.address, nft.address, nft_id, token.address, loan_amount, interest, 120, salt, deadline)
+        offer_hash = book.add(offer, getLendOffer(chain, pawn, lender, offer))
+        print(f"Posted offer {offer_hash}: {loan_amount} for {interest} interest")
+    if max_fills:
+        # any NFT from the vault, slightly cheaper than the offers above
+        offer = CollectionOffer(lender.address, nft.address, token.address, 1000, 90, 120, max_fills, 0, deadline)
+        offer_hash = book.add(offer, getLendOffer(chain, pawn, lender, offer))
+        print(f"Posted collection offer {offer_hash}: {max_fills} loans of 1000 for 90 interest")
+
+    # the borrower takes the cheapest one
+    offer, offer_signature = book.best(token.address, nft.address, nft_id, min_principal=1000, now=chain.pending_timestamp)
+    print(f"Best offer: {offer}")
+    deadline = PERMIT_TIMEOUT + chain.pending_timestamp
+    borrower_nft_signature = getNFTPermit(chain, nft, borrower, pawn, nft_id, deadline)
+    lender_token_signature = getTokenPermit(chain, token, lender, pawn, offer.principal, deadline)
+    if isinstance(offer, CollectionOffer):
+        tx = pawn.fillCollectionOffer(offer, offer_signature, nft_id, deadline, borrower_nft_signature, deadline, lender_token_signature, sender=borrower, gas_limit=100000000, gas_price=0, max_fee="0 gwei", max_priority_fee="0 gwei")
+    else:
+        tx = pawn.fillLendOffer(offer, offer_signature, deadline, borrower_nft_signature, deadline, lender_token_signature, sender=borrower, gas_limit=100000000, gas_price=0, max_fee="0 gwei", max_priority_fee="0 gwei")
+    logs = list(tx.decode_logs(pawn.LendOfferFilled))
+    assert len(logs) == 1
+    pawn_id = logs[0].pawnId
+    book.sync(tx.block_number, tx.block_number + 1)
+    print(f"Started pawn with id {pawn_id} using {tx.gas_used} gas")
+    print(f"Pawn data: {pawn.idToData(pawn_id)}")
+    print(f"Owner of nft with id {nft_id} is {nft.ownerOf(nft_id)}")
+    print(f"borrower funds: {token.balanceOf(borrower)}")
+    print(f"lender funds: {token.balanceOf(lender)}")
+    print(f"open offers of lender: {len(book.offers_of(lender))}")
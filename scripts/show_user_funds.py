@@ -3,6 +3,7 @@ from ape.cli import get_user_selected_account
 import click
 from ape.cli import network_option, NetworkBoundCommand, ape_cli_context
 from ape.api.networks import LOCAL_NETWORK_NAME
+from scripts._multicall import Multicall
 
 TOKEN_CONTRACT = "0xaFc50EfD29BE9d20280Ac8971c2C150997388b87"
 
@@ -17,14 +18,23 @@ def main():
 @click.command(cls=NetworkBoundCommand)
 @ape_cli_context()
 @network_option()
+@click.option("--multicall", "multicall_address", default=None, help="Address of the deployed Multicall contract, to read both balances in one call")
 # cli_ctx must go first
-def cli(cli_ctx, network):
+def cli(cli_ctx, network, multicall_address):
     """
     Deploy all contracts
     """
     borrower = get_user_selected_account("Select borrower")
     lender = get_user_selected_account("Select lender")
     token = project.Token.at(TOKEN_CONTRACT)
+    if multicall_address is None:
+        lender_balance = token.balanceOf(lender.address)
+        borrower_balance = token.balanceOf(borrower.address)
+    else:
+        reads = Multicall(project.Multicall.at(multicall_address))
+        reads.add(token, "balanceOf", lender.address)
+        reads.add(token, "balanceOf", borrower.address)
+        lender_balance, borrower_balance = reads.execute()
 
-    print(f"lender token balance: {token.balanceOf(lender)}")
-    print(f"borrower token balance: {token.balanceOf(borrower)}")
+    print(f"lender token balance: {lender_balance}")
+    print(f"borrower token balance: {borrower_balance}")
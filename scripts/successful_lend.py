@@ -4,7 +4,7 @@ from ape.cli import get_user_selected_account
 import click
 from ape.cli import network_option, NetworkBoundCommand, ape_cli_context
 from ape.api.networks import LOCAL_NETWORK_NAME
-from eip712.messages import EIP712Message
+from scripts._signing import getTokenPermit, getNFTPermit
 
 NFT_CONTRACT = "0xCf149676e251d37C1925c4993ac43F0E064AeBAB"
 TOKEN_CONTRACT = "0x3bBF90A454941368B9DCc06581dA11d806217540"
@@ -17,39 +17,6 @@ PAWN_REPAID = 1 << 3
 
 PERMIT_TIMEOUT = 120 # seconds
 
-def getTokenPermit(chain, token, owner, spender, amount, deadline):
-    class Permit(EIP712Message):
-        _name_: "string" = "TokenTest"
-        _version_: "string" = "1.0"
-        _chainId_: "uint256" = chain.chain_id
-        _verifyingContract_: "address" = token.address
-
-        owner: "address"
-        spender: "address"
-        value: "uint256"
-        nonce: "uint256"
-        deadline: "uint256"
-    
-    nonce = token.nonces(owner)
-    permit = Permit(owner.address, spender.address, amount, nonce, deadline)
-    return owner.sign_message(permit.signable_message).encode_rsv()
-
-def getNFTPermit(chain, nft, owner, spender, nft_id, deadline):
-    class Permit(EIP712Message):
-        _name_: "string" = "Owner NFT"
-        _version_: "string" = "1.0"
-        _chainId_: "uint256" = chain.chain_id
-        _verifyingContract_: "address" = nft.address
-
-        spender: "address"
-        tokenId: "uint256"
-        nonce: "uint256"
-        deadline: "uint256"
-    
-    nonce = nft.nonces(nft_id)
-    permit = Permit(spender.address, nft_id, nonce, deadline)
-    return owner.sign_message(permit.signable_message).encode_rsv()
-
 # default connect to a provider
 def main():
     pass
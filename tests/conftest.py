@@ -1,6 +1,52 @@
 import pytest
 from eip712.messages import EIP712Message
 
+from .gas_report import GasReport
+from .utils import Loan, create_pawn, fund_pawn
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("gas benchmarks")
+    group.addoption("--gas-iterations", type=int, default=5, help="Runs of each lifecycle path in test_benchmark.py")
+    group.addoption("--gas-report", default=None, help="Write the gas report to this path (.json or .csv)")
+    group.addoption("--gas-baseline", default=None, help="Fail benchmarks that regress against this report")
+    group.addoption("--gas-threshold", type=float, default=0.05, help="Allowed median gas increase over the baseline, as a fraction")
+
+@pytest.fixture(scope="session")
+def gas_iterations(request):
+    return request.config.getoption("--gas-iterations")
+
+@pytest.fixture(scope="session")
+def gas_report(request):
+    report = GasReport()
+    yield report
+    path = request.config.getoption("--gas-report")
+    if path and report.samples:
+        report.write(path)
+
+@pytest.fixture(scope="session")
+def gas_baseline(request):
+    path = request.config.getoption("--gas-baseline")
+    return GasReport.load(path) if path else None
+
+@pytest.fixture
+def check_gas_regressions(request, gas_report, gas_baseline):
+    """
+    Call with the operations a benchmark recorded to fail it if any of them
+    regressed past --gas-threshold relative to --gas-baseline.
+    """
+    threshold = request.config.getoption("--gas-threshold")
+
+    def check(*operations):
+        if gas_baseline is None:
+            return
+        regressions = gas_report.regressions(gas_baseline, threshold, operations)
+        assert not regressions, "gas regressions: " + ", ".join(
+            f"{op} {before:.0f} -> {after:.0f}" for op, before, after in regressions
+        )
+
+    return check
+
 @pytest.fixture(scope="session")
 def TokenPermit(chain, token):
     class Permit(EIP712Message):
@@ -33,6 +79,48 @@ def NFTPermit(chain, nft):
 
     return Permit
 
+
+@pytest.fixture(scope="session")
+def LendOffer(chain, pawn):
+    class LendOffer(EIP712Message):
+        _name_: "string" = "NiftyPawn"
+        _version_: "string" = "1.0"
+        _chainId_: "uint256" = chain.chain_id
+        _verifyingContract_: "address" = pawn.address
+
+        lender: "address"
+        nftVault: "address"
+        nftId: "uint256"
+        currency: "address"
+        principal: "uint256"
+        interest: "uint256"
+        durationInSeconds: "uint256"
+        salt: "uint256"
+        deadline: "uint256"
+
+    return LendOffer
+
+
+@pytest.fixture(scope="session")
+def CollectionOffer(chain, pawn):
+    class CollectionOffer(EIP712Message):
+        _name_: "string" = "NiftyPawn"
+        _version_: "string" = "1.0"
+        _chainId_: "uint256" = chain.chain_id
+        _verifyingContract_: "address" = pawn.address
+
+        lender: "address"
+        nftVault: "address"
+        currency: "address"
+        principal: "uint256"
+        interest: "uint256"
+        durationInSeconds: "uint256"
+        maxFills: "uint256"
+        salt: "uint256"
+        deadline: "uint256"
+
+    return CollectionOffer
+
 @pytest.fixture(scope="session")
 def owner(accounts):
     return accounts[0]
@@ -59,4 +147,65 @@ def nft(owner, project):
 
 @pytest.fixture(scope="session")
 def token(owner, project):
-    return owner.deploy(project.Token)
\ No newline at end of file
+    return owner.deploy(project.Token)
+
+@pytest.fixture(scope="session")
+def multicall(owner, project):
+    return owner.deploy(project.Multicall)
+
+def _create_loan(chain, pawn, nft, token, owner, borrower, NFTPermit, amount=100, interest=1, duration=100):
+    _, pawn_id = create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit, amount=amount, interest=interest, duration=duration)
+    return Loan(pawn_id, pawn.idToData(pawn_id).terms.nftId, amount, interest, duration)
+
+def _isolated(chain, build):
+    snapshot = chain.snapshot()
+    yield build()
+    chain.restore(snapshot)
+
+# Baselines are built once per module on top of a snapshot that is restored
+# when the module finishes, so their pawns never leak into other modules. The
+# function-scoped fixtures below snapshot the chain on top of them and revert
+# after each test, so every test starts from the same baseline state without
+# rebuilding it.
+
+@pytest.fixture(scope="module")
+def created_loan_baseline(chain, pawn, nft, token, owner, borrower, NFTPermit):
+    yield from _isolated(chain, lambda: _create_loan(chain, pawn, nft, token, owner, borrower, NFTPermit))
+
+@pytest.fixture(scope="module")
+def active_loan_baseline(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, TokenPermit):
+    def build():
+        loan = _create_loan(chain, pawn, nft, token, owner, borrower, NFTPermit)
+        fund_pawn(chain, pawn, token, owner, lender, TokenPermit, loan.pawn_id)
+        return loan
+    yield from _isolated(chain, build)
+
+@pytest.fixture(scope="module", params=[1, 5, 20], ids=lambda count: f"{count}-loans")
+def active_loans_baseline(request, chain, pawn, nft, token, owner, borrower, lender, NFTPermit, TokenPermit):
+    def build():
+        loans = [_create_loan(chain, pawn, nft, token, owner, borrower, NFTPermit) for _ in range(request.param)]
+        for loan in loans:
+            fund_pawn(chain, pawn, token, owner, lender, TokenPermit, loan.pawn_id)
+        return loans
+    yield from _isolated(chain, build)
+
+@pytest.fixture
+def loan_created(chain, created_loan_baseline):
+    """
+    A pawn in the CREATED state, listed by `borrower`.
+    """
+    yield from _isolated(chain, lambda: created_loan_baseline)
+
+@pytest.fixture
+def loan_active(chain, active_loan_baseline):
+    """
+    A pawn in the ACTIVE state, listed by `borrower` and funded by `lender`.
+    """
+    yield from _isolated(chain, lambda: active_loan_baseline)
+
+@pytest.fixture
+def active_loans(chain, active_loans_baseline):
+    """
+    1, 5 and 20 ACTIVE pawns between `borrower` and `lender`.
+    """
+    yield from _isolated(chain, lambda: active_loans_baseline)
@@ -0,0 +1,70 @@
+import csv
+import json
+import statistics
+from pathlib import Path
+
+
+class GasReport:
+    """
+    Collects gas used per operation across benchmark runs and writes it out
+    as JSON or CSV so reports from two commits can be compared.
+    """
+
+    FIELDS = ("operation", "count", "min", "max", "mean", "median")
+
+    def __init__(self):
+        self.samples = {}
+
+    def record(self, operation, gas_used):
+        self.samples.setdefault(operation, []).append(gas_used)
+
+    def summary(self):
+        return {
+            operation: {
+                "count": len(values),
+                "min": min(values),
+                "max": max(values),
+                "mean": statistics.mean(values),
+                "median": statistics.median(values),
+            }
+            for operation, values in sorted(self.samples.items())
+        }
+
+    def write(self, path):
+        path = Path(path)
+        summary = self.summary()
+        if path.suffix == ".csv":
+            with path.open("w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=self.FIELDS)
+                writer.writeheader()
+                for operation, stats in summary.items():
+                    writer.writerow({"operation": operation, **stats})
+        else:
+            path.write_text(json.dumps(summary, indent=2, sort_keys=True))
+
+    @staticmethod
+    def load(path):
+        path = Path(path)
+        if path.suffix == ".csv":
+            with path.open(newline="") as f:
+                return {
+                    row["operation"]: {k: float(v) for k, v in row.items() if k != "operation"}
+                    for row in csv.DictReader(f)
+                }
+        return json.loads(path.read_text())
+
+    def regressions(self, baseline, threshold, operations=None):
+        """
+        Return (operation, baseline median, current median) for every operation
+        whose median gas grew by more than `threshold` (a fraction) over `baseline`.
+        """
+        found = []
+        for operation, stats in self.summary().items():
+            if operations is not None and operation not in operations:
+                continue
+            if operation not in baseline:
+                continue
+            previous = baseline[operation]["median"]
+            if stats["median"] > previous * (1 + threshold):
+                found.append((operation, previous, stats["median"]))
+        return found
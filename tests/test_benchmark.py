@@ -0,0 +1,73 @@
+"""
+Gas benchmarks for the pawn lifecycle.
+
+Each path is run --gas-iterations times and every call's gas is recorded in the
+session gas report. The permit calls that the lifecycle functions make
+internally are also measured on their own so their share can be budgeted.
+
+    ape test tests/test_benchmark.py --gas-report gas.json
+    ape test tests/test_benchmark.py --gas-baseline gas.json --gas-threshold 0.02
+"""
+from .utils import (
+    create_pawn,
+    fund_pawn,
+    repay_pawn,
+    mint_nft,
+    generateNftPermitSignature,
+    generateTokenPermitSignature,
+)
+
+
+def test_benchmark_create(chain, pawn, nft, token, owner, borrower, NFTPermit, gas_report, gas_iterations, check_gas_regressions):
+    for _ in range(gas_iterations):
+        tx, _ = create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit)
+        gas_report.record("NiftyPawn.createTermsWithCollateral", tx.gas_used)
+    check_gas_regressions("NiftyPawn.createTermsWithCollateral")
+
+def test_benchmark_accept(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, TokenPermit, gas_report, gas_iterations, check_gas_regressions):
+    for _ in range(gas_iterations):
+        _, pawn_id = create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit)
+        tx = fund_pawn(chain, pawn, token, owner, lender, TokenPermit, pawn_id)
+        gas_report.record("NiftyPawn.acceptTermsAndFund", tx.gas_used)
+    check_gas_regressions("NiftyPawn.acceptTermsAndFund")
+
+def test_benchmark_repay(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, TokenPermit, gas_report, gas_iterations, check_gas_regressions):
+    for _ in range(gas_iterations):
+        _, pawn_id = create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit)
+        fund_pawn(chain, pawn, token, owner, lender, TokenPermit, pawn_id)
+        tx = repay_pawn(chain, pawn, token, owner, borrower, TokenPermit, pawn_id)
+        gas_report.record("NiftyPawn.repay", tx.gas_used)
+    check_gas_regressions("NiftyPawn.repay")
+
+def test_benchmark_claim(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, TokenPermit, gas_report, gas_iterations, check_gas_regressions):
+    for _ in range(gas_iterations):
+        _, pawn_id = create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit)
+        fund_pawn(chain, pawn, token, owner, lender, TokenPermit, pawn_id)
+        chain.pending_timestamp += pawn.idToData(pawn_id).terms.durationInSeconds
+        tx = pawn.claimDefaulted(pawn_id, sender=lender)
+        gas_report.record("NiftyPawn.claimDefaulted", tx.gas_used)
+    check_gas_regressions("NiftyPawn.claimDefaulted")
+
+def test_benchmark_cancel(chain, pawn, nft, token, owner, borrower, NFTPermit, gas_report, gas_iterations, check_gas_regressions):
+    for _ in range(gas_iterations):
+        _, pawn_id = create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit)
+        tx = pawn.cancelTerms(pawn_id, sender=borrower)
+        gas_report.record("NiftyPawn.cancelTerms", tx.gas_used)
+    check_gas_regressions("NiftyPawn.cancelTerms")
+
+def test_benchmark_nft_permit(chain, pawn, nft, owner, borrower, NFTPermit, gas_report, gas_iterations, check_gas_regressions):
+    for _ in range(gas_iterations):
+        nft_id = mint_nft(nft, owner, borrower)
+        deadline = chain.pending_timestamp + 60
+        permit = generateNftPermitSignature(nft, NFTPermit, borrower, pawn, nft_id, deadline)
+        tx = nft.permit(pawn, nft_id, deadline, permit, sender=borrower)
+        gas_report.record("NFT.permit", tx.gas_used)
+    check_gas_regressions("NFT.permit")
+
+def test_benchmark_token_permit(chain, pawn, token, lender, TokenPermit, gas_report, gas_iterations, check_gas_regressions):
+    for _ in range(gas_iterations):
+        deadline = chain.pending_timestamp + 60
+        permit = generateTokenPermitSignature(token, TokenPermit, lender, pawn, 100, deadline)
+        tx = token.permit(lender, pawn, 100, deadline, permit, sender=lender)
+        gas_report.record("Token.permit", tx.gas_used)
+    check_gas_regressions("Token.permit")
@@ -0,0 +1,36 @@
+from .utils import create_pawn, fund_pawn, repay_pawn
+
+# Gas ceilings for each lifecycle call. Lower these when an optimization lands
+# and only raise them deliberately.
+CREATE_GAS_CEILING = 400000
+ACCEPT_GAS_CEILING = 250000
+REPAY_GAS_CEILING = 220000
+CLAIM_GAS_CEILING = 140000
+CANCEL_GAS_CEILING = 150000
+
+def test_create_gas(chain, pawn, nft, token, owner, borrower, NFTPermit):
+    tx, _ = create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit)
+    assert tx.gas_used <= CREATE_GAS_CEILING
+
+def test_accept_gas(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, TokenPermit):
+    _, pawn_id = create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit)
+    tx = fund_pawn(chain, pawn, token, owner, lender, TokenPermit, pawn_id)
+    assert tx.gas_used <= ACCEPT_GAS_CEILING
+
+def test_repay_gas(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, TokenPermit):
+    _, pawn_id = create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit)
+    fund_pawn(chain, pawn, token, owner, lender, TokenPermit, pawn_id)
+    tx = repay_pawn(chain, pawn, token, owner, borrower, TokenPermit, pawn_id)
+    assert tx.gas_used <= REPAY_GAS_CEILING
+
+def test_claim_gas(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, TokenPermit):
+    _, pawn_id = create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit)
+    fund_pawn(chain, pawn, token, owner, lender, TokenPermit, pawn_id)
+    chain.pending_timestamp += 10
+    tx = pawn.claimDefaulted(pawn_id, sender=lender)
+    assert tx.gas_used <= CLAIM_GAS_CEILING
+
+def test_cancel_gas(chain, pawn, nft, token, owner, borrower, NFTPermit):
+    _, pawn_id = create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit)
+    tx = pawn.cancelTerms(pawn_id, sender=borrower)
+    assert tx.gas_used <= CANCEL_GAS_CEILING
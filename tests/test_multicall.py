@@ -0,0 +1,42 @@
+from .utils import mint_nft, create_pawn
+
+
+def test_aggregate(chain, multicall, nft, token, owner, receiver):
+    nft_id = mint_nft(nft, owner, receiver)
+    calls = [
+        (token.address, token.balanceOf.encode_input(owner)),
+        (nft.address, nft.ownerOf.encode_input(nft_id)),
+    ]
+    block_number, results = multicall.aggregate(calls)
+    assert block_number == chain.blocks.head.number
+    assert len(results) == 2
+    assert results[0].success
+    assert int.from_bytes(results[0].returnData, "big") == token.balanceOf(owner)
+    assert results[1].success
+    assert results[1].returnData[-20:] == bytes.fromhex(receiver.address[2:])
+
+
+def test_aggregate_failed_call(multicall, nft, token, owner):
+    calls = [
+        (nft.address, nft.ownerOf.encode_input(12345)),
+        (token.address, token.balanceOf.encode_input(owner)),
+    ]
+    _, results = multicall.aggregate(calls)
+    assert not results[0].success
+    assert results[1].success
+
+
+def test_aggregate_result_too_long(chain, multicall, pawn, nft, token, owner, borrower, NFTPermit):
+    _, first_id = create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit)
+    for _ in range(2):
+        create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit)
+    # three pawn entries encode to more than MAX_RETURNDATA bytes
+    calls = [(pawn.address, pawn.getPawns.encode_input(first_id, 3))]
+    _, results = multicall.aggregate(calls)
+    assert not results[0].success
+    assert results[0].returnData == b""
+
+
+def test_aggregate_empty(multicall):
+    _, results = multicall.aggregate([])
+    assert len(results) == 0
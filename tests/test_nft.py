@@ -120,3 +120,40 @@ def test_uri(nft, owner):
 def test_royaltyInfo(nft):
     expected_royalty = float(10.0/ 100.0 * ape.convert("1 ether", int))
     assert nft.royaltyInfo(1, "1 ether") == (nft.owner(), pytest.approx(expected_royalty))
+
+
+def test_mint_batch(nft, owner, receiver):
+    tx = nft.mintBatch(receiver, 5, sender=owner)
+    logs = list(tx.decode_logs(nft.Transfer))
+    assert [log.tokenId for log in logs] == list(range(5))
+    assert all(log.receiver == receiver for log in logs)
+    assert nft.totalSupply() == 5
+    assert nft.balanceOf(receiver) == 5
+    for nft_id in range(5):
+        assert nft.ownerOf(nft_id) == receiver.address
+
+    nft.mint(receiver, sender=owner)
+    assert nft.ownerOf(5) == receiver.address
+
+
+def test_mint_batch_not_minter(nft, owner, receiver):
+    with ape.reverts():
+        nft.mintBatch(receiver, 5, sender=receiver)
+    with ape.reverts():
+        nft.mintBatch(receiver, 0, sender=owner)
+
+
+def test_safe_transfer_from_batch(nft, owner, receiver):
+    nft.mintBatch(owner, 3, sender=owner)
+    tx = nft.safeTransferFromBatch(owner, receiver, [0, 2], sender=owner)
+    logs = list(tx.decode_logs(nft.Transfer))
+    assert [log.tokenId for log in logs] == [0, 2]
+    assert nft.balanceOf(owner) == 1
+    assert nft.balanceOf(receiver) == 2
+    assert nft.ownerOf(0) == receiver.address
+    assert nft.ownerOf(1) == owner.address
+    assert nft.ownerOf(2) == receiver.address
+
+    with ape.reverts():
+        nft.safeTransferFromBatch(owner, receiver, [1, 2], sender=owner)
+    assert nft.ownerOf(1) == owner.address
@@ -0,0 +1,20 @@
+from scripts._nonces import PermitNonces
+from scripts._signing import getNFTPermit
+
+
+def test_nft_nonces_ignore_mints(chain, nft, owner, borrower, lender):
+    nonces = PermitNonces(nft)
+    tx = nft.mint(borrower, sender=owner)
+    nft_id = list(tx.decode_logs(nft.Transfer))[0].tokenId
+    nonces.load([nft_id])
+    nonces.observe_transfers(tx.decode_logs(nft.Transfer))
+    assert nonces.peek(nft_id) == nft.nonces(nft_id)
+
+    deadline = chain.pending_timestamp + 60
+    nft.permit(lender, nft_id, deadline, getNFTPermit(chain, nft, borrower, lender, nft_id, deadline, nonces=nonces), sender=lender)
+    assert nonces.peek(nft_id) == nft.nonces(nft_id)
+
+    # transfers still bump the nonce
+    tx = nft.transferFrom(borrower, lender, nft_id, sender=lender)
+    nonces.observe_transfers(tx.decode_logs(nft.Transfer))
+    assert nonces.peek(nft_id) == nft.nonces(nft_id)
@@ -0,0 +1,60 @@
+from scripts._orderbook import OrderBook, OPEN, FILLED
+# aliased so the CollectionOffer fixture does not shadow it
+from scripts._signing import PAWN_DOMAIN_NAME, CollectionOffer as CollectionOfferTerms, LendOffer, domain_separator, offer_hash
+
+from .utils import mint_nft, generateNftPermitSignature, generateLendOfferSignature
+
+
+def test_lend_offer_hash_matches_contract(chain, pawn, nft, token, lender):
+    offer = LendOffer(lender.address, nft.address, 7, token.address, 100, 1, 10, 3, chain.pending_timestamp + 60)
+    domain = domain_separator(chain, pawn, PAWN_DOMAIN_NAME)
+    assert offer_hash(domain, offer) == pawn.hashLendOffer(offer)
+
+def test_orderbook_sync_filled_lend_offer(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, LendOffer):
+    nft_id = mint_nft(nft, owner, borrower)
+    token.transfer(lender, 100, sender=owner)
+    token.approve(pawn, 100, sender=lender)
+    offer = (lender.address, nft.address, nft_id, token.address, 100, 1, 10, 0, chain.pending_timestamp + 60)
+    offer_signature = generateLendOfferSignature(LendOffer, lender, offer)
+
+    book = OrderBook(chain, pawn)
+    key = book.add(offer, offer_signature)
+    assert key == "0x" + bytes(pawn.hashLendOffer(offer)).hex()
+    matched = book.match(token.address, nft.address, nft_id, now=chain.pending_timestamp)
+    assert [tuple(matched_offer) for matched_offer, _ in matched] == [offer]
+    assert matched[0][1] == bytes(offer_signature)
+
+    deadline = chain.pending_timestamp + 60
+    nft_permit = generateNftPermitSignature(nft, NFTPermit, borrower, pawn, nft_id, deadline)
+    tx = pawn.fillLendOffer(offer, offer_signature, deadline, nft_permit, 0, b"", sender=borrower)
+
+    book.sync(tx.block_number, tx.block_number + 1)
+    assert book.match(token.address, nft.address, nft_id, now=chain.pending_timestamp) == []
+    assert book.offers_of(lender, status=OPEN) == []
+    assert [tuple(filled) for filled, _ in book.offers_of(lender, status=FILLED)] == [offer]
+
+def test_collection_offer_hash_matches_contract(chain, pawn, nft, token, lender):
+    offer = CollectionOfferTerms(lender.address, nft.address, token.address, 100, 1, 10, 4, 3, chain.pending_timestamp + 60)
+    domain = domain_separator(chain, pawn, PAWN_DOMAIN_NAME)
+    assert offer_hash(domain, offer) == pawn.hashCollectionOffer(offer)
+
+def test_orderbook_sync_collection_offer_fills(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, CollectionOffer):
+    token.transfer(lender, 200, sender=owner)
+    token.approve(pawn, 200, sender=lender)
+    offer = (lender.address, nft.address, token.address, 100, 1, 10, 2, 0, chain.pending_timestamp + 60)
+    offer_signature = generateLendOfferSignature(CollectionOffer, lender, offer)
+
+    book = OrderBook(chain, pawn)
+    book.add(CollectionOfferTerms(*offer), offer_signature)
+    deadline = chain.pending_timestamp + 60
+    nft_ids = [mint_nft(nft, owner, borrower) for _ in range(3)]
+    for fills, nft_id in enumerate(nft_ids[:2], start=1):
+        # still matched by any NFT of the vault until the last fill is synced
+        assert len(book.match(token.address, nft.address, nft_ids[2], now=chain.pending_timestamp)) == 1
+        nft_permit = generateNftPermitSignature(nft, NFTPermit, borrower, pawn, nft_id, deadline)
+        tx = pawn.fillCollectionOffer(offer, offer_signature, nft_id, deadline, nft_permit, 0, b"", sender=borrower)
+        book.sync(tx.block_number, tx.block_number + 1)
+        status = OPEN if fills < 2 else FILLED
+        assert [tuple(synced) for synced, _ in book.offers_of(lender, status=status)] == [offer]
+
+    assert book.match(token.address, nft.address, nft_ids[2], now=chain.pending_timestamp) == []
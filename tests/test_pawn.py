@@ -1,6 +1,8 @@
 import ape
 import pytest
 
+from .utils import mint_nft, generateNftPermitSignature, generateTokenPermitSignature, generateLendOfferSignature, create_pawn, fund_pawn, repay_pawn
+
 ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
 
 def test_init(pawn, owner):
@@ -10,26 +12,6 @@ def test_init(pawn, owner):
     with ape.reverts():
         print(pawn.stateOf(1))
 
-def mint_nft(nft, owner, receiver):
-    tx = nft.mint(receiver, sender=owner)
-    logs = list(tx.decode_logs(nft.Transfer))
-    assert len(logs) == 1
-    assert logs[0].receiver == receiver
-    nft_id = logs[0].tokenId
-    assert nft.ownerOf(nft_id) == receiver.address
-    assert nft.idToApprovals(nft_id) == ZERO_ADDRESS
-    return nft_id
-
-def generateNftPermitSignature(nft, Permit, owner, approved, nft_id, deadline):
-    nonce = nft.nonces(nft_id)
-    permit = Permit(approved.address, nft_id, nonce, deadline)
-    return owner.sign_message(permit.signable_message).encode_rsv()
-
-def generateTokenPermitSignature(token, Permit, owner, approved, amount, deadline):
-    nonce = token.nonces(owner)
-    permit = Permit(owner.address, approved.address, amount, nonce, deadline)
-    return owner.sign_message(permit.signable_message).encode_rsv()
-
 def test_create_terms_with_collateral(chain, pawn, nft, token, owner, borrower, NFTPermit):
     nft_id = mint_nft(nft, owner, borrower)
     deadline = chain.pending_timestamp + 60
@@ -332,4 +314,444 @@ def test_claim_too_early(chain, pawn, nft, token, owner, borrower, lender, NFTPe
     chain.pending_timestamp += 8
 
     with ape.reverts():
-        pawn.claimDefaulted(pawn_id, sender=lender)
\ No newline at end of file
+        pawn.claimDefaulted(pawn_id, sender=lender)
+
+def test_create_terms_with_collateral_batch(chain, pawn, nft, token, owner, borrower, NFTPermit):
+    deadline = chain.pending_timestamp + 60
+    amount = 100
+    interest = 1
+    duration = 10
+
+    nft_ids = [mint_nft(nft, owner, borrower) for _ in range(3)]
+    terms = [(nft.address, nft_id, token.address, amount, interest, duration) for nft_id in nft_ids]
+    deadlines = [deadline] * len(nft_ids)
+    permits = [generateNftPermitSignature(nft, NFTPermit, borrower, pawn, nft_id, deadline) for nft_id in nft_ids]
+
+    tx = pawn.createTermsWithCollateralBatch(terms, deadlines, permits, sender=borrower)
+    logs = list(tx.decode_logs(pawn.PawnCreated))
+    assert len(logs) == len(nft_ids)
+    pawn_ids = [log.pawnId for log in logs]
+    assert pawn_ids == list(range(pawn_ids[0], pawn_ids[0] + len(nft_ids)))
+    for pawn_id, nft_id in zip(pawn_ids, nft_ids):
+        assert pawn.stateOf(pawn_id) == 1
+        assert pawn.idToData(pawn_id).terms.nftId == nft_id
+        assert pawn.idToData(pawn_id).borrower == borrower.address
+        assert nft.ownerOf(nft_id) == pawn.address
+
+def test_create_terms_with_collateral_batch_length_mismatch(chain, pawn, nft, token, owner, borrower, NFTPermit):
+    deadline = chain.pending_timestamp + 60
+    nft_ids = [mint_nft(nft, owner, borrower) for _ in range(2)]
+    terms = [(nft.address, nft_id, token.address, 100, 1, 10) for nft_id in nft_ids]
+    permits = [generateNftPermitSignature(nft, NFTPermit, borrower, pawn, nft_id, deadline) for nft_id in nft_ids]
+
+    with ape.reverts():
+        pawn.createTermsWithCollateralBatch(terms, [deadline], permits, sender=borrower)
+
+def test_pawn_data_after_accept(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, TokenPermit):
+    nft_id = mint_nft(nft, owner, borrower)
+    deadline = chain.pending_timestamp + 60
+    amount = 100
+    interest = 1
+    duration = 10
+    nft_permit = generateNftPermitSignature(nft, NFTPermit, borrower, pawn, nft_id, deadline)
+    token_permit = generateTokenPermitSignature(token, TokenPermit, lender, pawn, amount, deadline)
+
+    terms = (nft.address, nft_id, token.address, amount, interest, duration)
+
+    tx = pawn.createTermsWithCollateral(terms, deadline, nft_permit, sender=borrower)
+    pawn_id = list(tx.decode_logs(pawn.PawnCreated))[0].pawnId
+    token.transfer(lender, amount, sender=owner)
+
+    tx = pawn.acceptTermsAndFund(pawn_id, deadline, token_permit, sender=lender)
+    data = pawn.idToData(pawn_id)
+    assert data.terms.nftVault == nft.address
+    assert data.terms.nftId == nft_id
+    assert data.terms.currency == token.address
+    assert data.terms.principal == amount
+    assert data.terms.interest == interest
+    assert data.terms.durationInSeconds == duration
+    assert data.state == 2
+    assert data.startTimestamp == chain.blocks[tx.block_number].timestamp
+    assert data.borrower == borrower.address
+    assert data.lender == lender.address
+
+def test_create_terms_duration_too_long(chain, pawn, nft, token, owner, borrower, NFTPermit):
+    nft_id = mint_nft(nft, owner, borrower)
+    deadline = chain.pending_timestamp + 60
+    permit = generateNftPermitSignature(nft, NFTPermit, borrower, pawn, nft_id, deadline)
+
+    terms = (nft.address, nft_id, token.address, 100, 1, 2**64)
+
+    with ape.reverts():
+        pawn.createTermsWithCollateral(terms, deadline, permit, sender=borrower)
+
+def test_pawn_indexes(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, TokenPermit):
+    borrower_count = pawn.borrowerPawnCount(borrower)
+    lender_count = pawn.lenderPawnCount(lender)
+    active_count = pawn.activePawnCount()
+
+    pawn_ids = [create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit)[1] for _ in range(3)]
+    assert pawn.borrowerPawnCount(borrower) == borrower_count + 3
+    entries = pawn.pawnsOfBorrower(borrower, borrower_count, 10)
+    assert [entry.pawnId for entry in entries] == pawn_ids
+    assert all(entry.data.borrower == borrower.address for entry in entries)
+
+    for pawn_id in pawn_ids:
+        fund_pawn(chain, pawn, token, owner, lender, TokenPermit, pawn_id)
+    assert pawn.lenderPawnCount(lender) == lender_count + 3
+    assert [entry.pawnId for entry in pawn.pawnsOfLender(lender, lender_count, 2)] == pawn_ids[:2]
+    assert pawn.activePawnCount() == active_count + 3
+
+    repay_pawn(chain, pawn, token, owner, borrower, TokenPermit, pawn_ids[0])
+    assert pawn.activePawnCount() == active_count + 2
+    active_ids = [entry.pawnId for entry in pawn.activePawns(0, 100)]
+    assert pawn_ids[0] not in active_ids
+    assert set(pawn_ids[1:]) <= set(active_ids)
+
+    chain.pending_timestamp += 10
+    pawn.claimDefaulted(pawn_ids[2], sender=lender)
+    assert pawn.activePawnCount() == active_count + 1
+    active_ids = [entry.pawnId for entry in pawn.activePawns(0, 100)]
+    assert pawn_ids[1] in active_ids
+    assert pawn_ids[2] not in active_ids
+    assert pawn.lenderPawnCount(lender) == lender_count + 3
+
+def test_get_pawns(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, TokenPermit):
+    first_id = pawn.nextPawnId()
+    pawn_ids = [create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit)[1] for _ in range(3)]
+    assert pawn_ids == [first_id, first_id + 1, first_id + 2]
+    assert pawn.nextPawnId() == first_id + 3
+
+    fund_pawn(chain, pawn, token, owner, lender, TokenPermit, pawn_ids[1])
+    fund_pawn(chain, pawn, token, owner, lender, TokenPermit, pawn_ids[2])
+    chain.pending_timestamp += 10
+    chain.mine()
+
+    entries = pawn.getPawns(first_id, 10)
+    assert [entry.pawnId for entry in entries] == pawn_ids
+    assert [entry.data.state for entry in entries] == [1, 2, 2]
+    assert entries[0].amountDue == 0
+    assert not entries[0].inDefault
+    assert entries[1].inDefault
+    assert entries[1].amountDue == 0
+
+    entries = pawn.getPawns(first_id, 1)
+    assert [entry.pawnId for entry in entries] == pawn_ids[:1]
+
+def test_get_pawns_amount_due(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, TokenPermit):
+    _, pawn_id = create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit, amount=100, interest=5, duration=100)
+    fund_pawn(chain, pawn, token, owner, lender, TokenPermit, pawn_id)
+    entry = pawn.getPawns(pawn_id, 1)[0]
+    assert entry.amountDue == 105
+    assert not entry.inDefault
+
+def test_repay_batch(accounts, chain, pawn, nft, token, owner, borrower, lender, NFTPermit, TokenPermit):
+    other_lender = accounts[3]
+    amount = 100
+    interest = 1
+    created = [create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit, amount=amount, interest=interest, duration=100) for _ in range(3)]
+    pawn_ids = [pawn_id for _, pawn_id in created]
+    fund_pawn(chain, pawn, token, owner, lender, TokenPermit, pawn_ids[0])
+    fund_pawn(chain, pawn, token, owner, other_lender, TokenPermit, pawn_ids[1])
+    fund_pawn(chain, pawn, token, owner, lender, TokenPermit, pawn_ids[2])
+    lender_balance = token.balanceOf(lender)
+    other_lender_balance = token.balanceOf(other_lender)
+
+    total = 3 * (amount + interest)
+    token.transfer(borrower, total - token.balanceOf(borrower), sender=owner)
+    deadline = chain.pending_timestamp + 60
+    permit = generateTokenPermitSignature(token, TokenPermit, borrower, pawn, total, deadline)
+
+    tx = pawn.repayBatch(pawn_ids, deadline, permit, sender=borrower)
+    logs = list(tx.decode_logs(pawn.PawnRepaid))
+    assert [log.pawnId for log in logs] == pawn_ids
+    # one Approval from the permit and one Transfer per distinct lender
+    assert len([log for log in tx.logs if log["address"] == token.address]) == 3
+    assert token.balanceOf(lender) == lender_balance + 2 * (amount + interest)
+    assert token.balanceOf(other_lender) == other_lender_balance + amount + interest
+    assert token.balanceOf(borrower) == 0
+    for pawn_id in pawn_ids:
+        assert pawn.stateOf(pawn_id) == 8
+        assert nft.ownerOf(pawn.idToData(pawn_id).terms.nftId) == borrower.address
+
+def test_repay_batch_late(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, TokenPermit):
+    pawn_ids = [create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit, duration=100)[1], create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit, duration=10)[1]]
+    for pawn_id in pawn_ids:
+        fund_pawn(chain, pawn, token, owner, lender, TokenPermit, pawn_id)
+    chain.pending_timestamp += 10
+
+    token.transfer(borrower, 2, sender=owner)
+    deadline = chain.pending_timestamp + 60
+    permit = generateTokenPermitSignature(token, TokenPermit, borrower, pawn, 202, deadline)
+    with ape.reverts():
+        pawn.repayBatch(pawn_ids, deadline, permit, sender=borrower)
+
+def test_claim_batch(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, TokenPermit):
+    pawn_ids = [create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit)[1] for _ in range(2)]
+    for pawn_id in pawn_ids:
+        fund_pawn(chain, pawn, token, owner, lender, TokenPermit, pawn_id)
+    chain.pending_timestamp += 10
+
+    tx = pawn.claimDefaultedBatch(pawn_ids, sender=lender)
+    logs = list(tx.decode_logs(pawn.PawnDefaultClaimed))
+    assert [log.pawnId for log in logs] == pawn_ids
+    for pawn_id in pawn_ids:
+        assert pawn.stateOf(pawn_id) == 4
+        assert nft.ownerOf(pawn.idToData(pawn_id).terms.nftId) == lender.address
+
+def test_claim_batch_not_lender(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, TokenPermit):
+    _, pawn_id = create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit)
+    fund_pawn(chain, pawn, token, owner, lender, TokenPermit, pawn_id)
+    chain.pending_timestamp += 10
+
+    with ape.reverts():
+        pawn.claimDefaultedBatch([pawn_id], sender=borrower)
+
+def test_accept_and_repay_with_allowance(chain, pawn, nft, token, owner, borrower, lender, NFTPermit):
+    amount = 100
+    interest = 1
+    _, pawn_id = create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit, amount=amount, interest=interest, duration=100)
+    token.transfer(lender, amount, sender=owner)
+    token.approve(pawn, 10 * amount, sender=lender)
+
+    tx = pawn.acceptTermsAndFund(pawn_id, 0, b"", sender=lender)
+    assert len(list(tx.decode_logs(token.Approval))) == 0
+    assert pawn.stateOf(pawn_id) == 2
+    assert token.allowance(lender, pawn) == 9 * amount
+
+    token.transfer(borrower, interest, sender=owner)
+    token.approve(pawn, amount + interest, sender=borrower)
+    pawn.repay(pawn_id, 0, b"", sender=borrower)
+    assert pawn.stateOf(pawn_id) == 8
+    assert token.allowance(borrower, pawn) == 0
+
+def test_accept_without_permit_or_allowance(chain, pawn, nft, token, owner, borrower, lender, NFTPermit):
+    _, pawn_id = create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit)
+    token.transfer(lender, 100, sender=owner)
+
+    with ape.reverts():
+        pawn.acceptTermsAndFund(pawn_id, 0, b"", sender=lender)
+
+def _lend_offer(chain, nft, token, lender, nft_id, amount=100, interest=1, duration=10, salt=0):
+    return (lender.address, nft.address, nft_id, token.address, amount, interest, duration, salt, chain.pending_timestamp + 60)
+
+def test_fill_lend_offer(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, TokenPermit, LendOffer):
+    nft_id = mint_nft(nft, owner, borrower)
+    amount = 100
+    token.transfer(lender, amount, sender=owner)
+    offer = _lend_offer(chain, nft, token, lender, nft_id, amount=amount)
+    offer_signature = generateLendOfferSignature(LendOffer, lender, offer)
+
+    deadline = chain.pending_timestamp + 60
+    nft_permit = generateNftPermitSignature(nft, NFTPermit, borrower, pawn, nft_id, deadline)
+    token_permit = generateTokenPermitSignature(token, TokenPermit, lender, pawn, amount, deadline)
+    active_count = pawn.activePawnCount()
+    tx = pawn.fillLendOffer(offer, offer_signature, deadline, nft_permit, deadline, token_permit, sender=borrower)
+
+    pawn_id = list(tx.decode_logs(pawn.PawnCreated))[0].pawnId
+    assert list(tx.decode_logs(pawn.PawnStarted))[0].pawnId == pawn_id
+    filled = list(tx.decode_logs(pawn.LendOfferFilled))
+    assert len(filled) == 1
+    offer_hash = pawn.hashLendOffer(offer)
+    assert filled[0].offerHash == offer_hash
+    assert filled[0].pawnId == pawn_id
+    assert pawn.offerFills(offer_hash) == 1
+
+    data = pawn.idToData(pawn_id)
+    assert data.state == 2
+    assert data.borrower == borrower.address
+    assert data.lender == lender.address
+    assert data.startTimestamp == chain.blocks[tx.block_number].timestamp
+    assert nft.ownerOf(nft_id) == pawn.address
+    assert token.balanceOf(borrower) == amount
+    assert token.balanceOf(lender) == 0
+    assert pawn.activePawnCount() == active_count + 1
+    assert pawn.lenderPawnByIndex(lender, pawn.lenderPawnCount(lender) - 1) == pawn_id
+
+def test_fill_lend_offer_twice(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, LendOffer):
+    nft_id = mint_nft(nft, owner, borrower)
+    token.transfer(lender, 200, sender=owner)
+    token.approve(pawn, 200, sender=lender)
+    offer = _lend_offer(chain, nft, token, lender, nft_id)
+    offer_signature = generateLendOfferSignature(LendOffer, lender, offer)
+
+    deadline = chain.pending_timestamp + 60
+    nft_permit = generateNftPermitSignature(nft, NFTPermit, borrower, pawn, nft_id, deadline)
+    pawn.fillLendOffer(offer, offer_signature, deadline, nft_permit, 0, b"", sender=borrower)
+
+    other_id = mint_nft(nft, owner, borrower)
+    nft_permit = generateNftPermitSignature(nft, NFTPermit, borrower, pawn, other_id, deadline)
+    with ape.reverts("offer filled or canceled"):
+        pawn.fillLendOffer(offer, offer_signature, deadline, nft_permit, 0, b"", sender=borrower)
+
+def test_fill_canceled_lend_offer(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, LendOffer):
+    nft_id = mint_nft(nft, owner, borrower)
+    token.transfer(lender, 100, sender=owner)
+    token.approve(pawn, 100, sender=lender)
+    offer = _lend_offer(chain, nft, token, lender, nft_id)
+    offer_signature = generateLendOfferSignature(LendOffer, lender, offer)
+
+    with ape.reverts():
+        pawn.cancelLendOffer(offer, sender=borrower)
+    tx = pawn.cancelLendOffer(offer, sender=lender)
+    assert list(tx.decode_logs(pawn.LendOfferCanceled))[0].offerHash == pawn.hashLendOffer(offer)
+
+    deadline = chain.pending_timestamp + 60
+    nft_permit = generateNftPermitSignature(nft, NFTPermit, borrower, pawn, nft_id, deadline)
+    with ape.reverts("offer filled or canceled"):
+        pawn.fillLendOffer(offer, offer_signature, deadline, nft_permit, 0, b"", sender=borrower)
+
+def test_fill_lend_offer_bad_signature(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, LendOffer):
+    nft_id = mint_nft(nft, owner, borrower)
+    token.transfer(lender, 100, sender=owner)
+    token.approve(pawn, 100, sender=lender)
+    offer = _lend_offer(chain, nft, token, lender, nft_id)
+    # signed by the borrower instead of the lender
+    offer_signature = generateLendOfferSignature(LendOffer, borrower, offer)
+
+    deadline = chain.pending_timestamp + 60
+    nft_permit = generateNftPermitSignature(nft, NFTPermit, borrower, pawn, nft_id, deadline)
+    with ape.reverts("invalid offer signature"):
+        pawn.fillLendOffer(offer, offer_signature, deadline, nft_permit, 0, b"", sender=borrower)
+
+def test_fill_collection_offer(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, CollectionOffer):
+    amount = 100
+    token.transfer(lender, 3 * amount, sender=owner)
+    token.approve(pawn, 3 * amount, sender=lender)
+    offer = (lender.address, nft.address, token.address, amount, 1, 10, 2, 0, chain.pending_timestamp + 60)
+    offer_signature = generateLendOfferSignature(CollectionOffer, lender, offer)
+    offer_hash = pawn.hashCollectionOffer(offer)
+
+    deadline = chain.pending_timestamp + 60
+    nft_ids = [mint_nft(nft, owner, borrower) for _ in range(3)]
+    pawn_ids = []
+    for nft_id in nft_ids[:2]:
+        nft_permit = generateNftPermitSignature(nft, NFTPermit, borrower, pawn, nft_id, deadline)
+        tx = pawn.fillCollectionOffer(offer, offer_signature, nft_id, deadline, nft_permit, 0, b"", sender=borrower)
+        logs = list(tx.decode_logs(pawn.LendOfferFilled))
+        assert logs[0].offerHash == offer_hash
+        pawn_ids.append(logs[0].pawnId)
+
+    assert pawn.offerFills(offer_hash) == 2
+    for pawn_id, nft_id in zip(pawn_ids, nft_ids):
+        data = pawn.idToData(pawn_id)
+        assert data.state == 2
+        assert data.terms.nftId == nft_id
+        assert data.lender == lender.address
+        assert nft.ownerOf(nft_id) == pawn.address
+    assert token.balanceOf(borrower) == 2 * amount
+
+    nft_permit = generateNftPermitSignature(nft, NFTPermit, borrower, pawn, nft_ids[2], deadline)
+    with ape.reverts("offer filled or canceled"):
+        pawn.fillCollectionOffer(offer, offer_signature, nft_ids[2], deadline, nft_permit, 0, b"", sender=borrower)
+
+def test_fill_canceled_collection_offer(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, CollectionOffer):
+    token.transfer(lender, 100, sender=owner)
+    token.approve(pawn, 100, sender=lender)
+    offer = (lender.address, nft.address, token.address, 100, 1, 10, 5, 0, chain.pending_timestamp + 60)
+    offer_signature = generateLendOfferSignature(CollectionOffer, lender, offer)
+    pawn.cancelCollectionOffer(offer, sender=lender)
+
+    nft_id = mint_nft(nft, owner, borrower)
+    deadline = chain.pending_timestamp + 60
+    nft_permit = generateNftPermitSignature(nft, NFTPermit, borrower, pawn, nft_id, deadline)
+    with ape.reverts("offer filled or canceled"):
+        pawn.fillCollectionOffer(offer, offer_signature, nft_id, deadline, nft_permit, 0, b"", sender=borrower)
+
+def _create_bundle(chain, pawn, nft, token, owner, borrower, NFTPermit, size, amount=100, interest=1, duration=10):
+    nft_ids = [mint_nft(nft, owner, borrower) for _ in range(size)]
+    deadline = chain.pending_timestamp + 60
+    permits = [generateNftPermitSignature(nft, NFTPermit, borrower, pawn, nft_id, deadline) for nft_id in nft_ids]
+    terms = (nft.address, nft_ids[0], token.address, amount, interest, duration)
+    extra_items = [(nft.address, nft_id) for nft_id in nft_ids[1:]]
+    tx = pawn.createBundleWithCollateral(terms, extra_items, [deadline] * size, permits, sender=borrower)
+    logs = list(tx.decode_logs(pawn.PawnCreated))
+    assert len(logs) == 1
+    return logs[0].pawnId, nft_ids
+
+def test_create_bundle_and_repay(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, TokenPermit):
+    pawn_id, nft_ids = _create_bundle(chain, pawn, nft, token, owner, borrower, NFTPermit, 3)
+    assert [item.nftId for item in pawn.bundleOf(pawn_id)] == nft_ids
+    assert all(nft.ownerOf(nft_id) == pawn.address for nft_id in nft_ids)
+    assert pawn.idToData(pawn_id).terms.nftId == nft_ids[0]
+
+    fund_pawn(chain, pawn, token, owner, lender, TokenPermit, pawn_id)
+    tx = repay_pawn(chain, pawn, token, owner, borrower, TokenPermit, pawn_id)
+    assert len(list(tx.decode_logs(pawn.PawnRepaid))) == 1
+    assert all(nft.ownerOf(nft_id) == borrower.address for nft_id in nft_ids)
+
+def test_cancel_bundle(chain, pawn, nft, token, owner, borrower, NFTPermit):
+    pawn_id, nft_ids = _create_bundle(chain, pawn, nft, token, owner, borrower, NFTPermit, 3)
+
+    pawn.cancelTerms(pawn_id, sender=borrower)
+    assert all(nft.ownerOf(nft_id) == borrower.address for nft_id in nft_ids)
+    assert len(pawn.bundleOf(pawn_id)) == 0
+
+def test_claim_bundle(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, TokenPermit):
+    pawn_id, nft_ids = _create_bundle(chain, pawn, nft, token, owner, borrower, NFTPermit, 3)
+    fund_pawn(chain, pawn, token, owner, lender, TokenPermit, pawn_id)
+    chain.pending_timestamp += 10
+
+    pawn.claimDefaulted(pawn_id, sender=lender)
+    assert all(nft.ownerOf(nft_id) == lender.address for nft_id in nft_ids)
+
+def test_create_bundle_length_mismatch(chain, pawn, nft, token, owner, borrower, NFTPermit):
+    nft_ids = [mint_nft(nft, owner, borrower) for _ in range(2)]
+    deadline = chain.pending_timestamp + 60
+    permit = generateNftPermitSignature(nft, NFTPermit, borrower, pawn, nft_ids[0], deadline)
+    terms = (nft.address, nft_ids[0], token.address, 100, 1, 10)
+
+    with ape.reverts("bundle length mismatch"):
+        pawn.createBundleWithCollateral(terms, [(nft.address, nft_ids[1])], [deadline], [permit], sender=borrower)
+
+def test_set_reclaim_storage_not_owner(pawn, borrower):
+    assert not pawn.reclaimStorage()
+    with ape.reverts():
+        pawn.setReclaimStorage(True, sender=borrower)
+
+def test_reclaim_storage_on_repay(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, TokenPermit):
+    pawn.setReclaimStorage(True, sender=owner)
+    pawn_id, nft_ids = _create_bundle(chain, pawn, nft, token, owner, borrower, NFTPermit, 2, amount=100, interest=1, duration=10)
+    fund_pawn(chain, pawn, token, owner, lender, TokenPermit, pawn_id)
+    start = pawn.idToData(pawn_id).startTimestamp
+
+    tx = repay_pawn(chain, pawn, token, owner, borrower, TokenPermit, pawn_id)
+    assert len(list(tx.decode_logs(pawn.PawnRepaid))) == 1
+    logs = list(tx.decode_logs(pawn.PawnArchived))
+    assert len(logs) == 1
+    assert logs[0].pawnId == pawn_id
+    assert logs[0].state == 8
+    assert logs[0].borrower == borrower.address
+    assert logs[0].lender == lender.address
+    assert logs[0].nftVault == nft.address
+    assert logs[0].nftId == nft_ids[0]
+    assert logs[0].currency == token.address
+    assert logs[0].principal == 100
+    assert logs[0].interest == 1
+    assert logs[0].durationInSeconds == 10
+    assert logs[0].startTimestamp == start
+    assert list(logs[0].bundleIds) == nft_ids[1:]
+
+    data = pawn.idToData(pawn_id)
+    assert data.state == 0
+    assert data.borrower == ZERO_ADDRESS
+    assert len(pawn.bundleOf(pawn_id)) == 0
+    assert all(nft.ownerOf(nft_id) == borrower.address for nft_id in nft_ids)
+
+def test_reclaim_storage_on_claim(chain, pawn, nft, token, owner, borrower, lender, NFTPermit, TokenPermit):
+    pawn.setReclaimStorage(True, sender=owner)
+    _, pawn_id = create_pawn(chain, pawn, nft, token, owner, borrower, NFTPermit)
+    nft_id = pawn.idToData(pawn_id).terms.nftId
+    fund_pawn(chain, pawn, token, owner, lender, TokenPermit, pawn_id)
+    chain.pending_timestamp += 10
+
+    tx = pawn.claimDefaulted(pawn_id, sender=lender)
+    logs = list(tx.decode_logs(pawn.PawnArchived))
+    assert len(logs) == 1
+    assert logs[0].state == 4
+    assert len(logs[0].bundleIds) == 0
+    assert pawn.idToData(pawn_id).state == 0
+    assert nft.ownerOf(nft_id) == lender.address
+
+    with ape.reverts():
+        pawn.claimDefaulted(pawn_id, sender=lender)
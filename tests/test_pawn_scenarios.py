@@ -0,0 +1,157 @@
+import ape
+
+from .utils import generateTokenPermitSignature, generateLendOfferSignature
+
+
+# Tests that end a baseline pawn first check it is untouched, so whichever of
+# them runs later also checks the earlier one's changes were reverted.
+
+def test_cancel_created_loan(pawn, nft, borrower, loan_created):
+    assert pawn.stateOf(loan_created.pawn_id) == 1
+    assert nft.ownerOf(loan_created.nft_id) == pawn.address
+    tx = pawn.cancelTerms(loan_created.pawn_id, sender=borrower)
+    assert len(list(tx.decode_logs(pawn.PawnCanceled))) == 1
+    assert nft.ownerOf(loan_created.nft_id) == borrower.address
+    assert pawn.idToData(loan_created.pawn_id).state == 0
+
+def test_cancel_created_loan_not_borrower(pawn, lender, loan_created):
+    with ape.reverts():
+        pawn.cancelTerms(loan_created.pawn_id, sender=lender)
+
+def test_repay_active_loan(chain, pawn, nft, token, owner, borrower, lender, TokenPermit, loan_active):
+    assert pawn.stateOf(loan_active.pawn_id) == 2
+    assert nft.ownerOf(loan_active.nft_id) == pawn.address
+    due = loan_active.amount + loan_active.interest
+    token.transfer(borrower, due, sender=owner)
+    lender_balance = token.balanceOf(lender)
+    deadline = chain.pending_timestamp + 60
+    permit = generateTokenPermitSignature(token, TokenPermit, borrower, pawn, due, deadline)
+
+    pawn.repay(loan_active.pawn_id, deadline, permit, sender=borrower)
+    assert pawn.stateOf(loan_active.pawn_id) == 8
+    assert token.balanceOf(lender) == lender_balance + due
+    assert nft.ownerOf(loan_active.nft_id) == borrower.address
+
+def test_claim_active_loan_too_early(pawn, lender, loan_active):
+    with ape.reverts():
+        pawn.claimDefaulted(loan_active.pawn_id, sender=lender)
+
+def test_claim_active_loan(chain, pawn, nft, lender, loan_active):
+    assert pawn.stateOf(loan_active.pawn_id) == 2
+    assert nft.ownerOf(loan_active.nft_id) == pawn.address
+    chain.pending_timestamp += loan_active.duration
+    pawn.claimDefaulted(loan_active.pawn_id, sender=lender)
+    assert pawn.stateOf(loan_active.pawn_id) == 4
+    assert nft.ownerOf(loan_active.nft_id) == lender.address
+
+def test_claim_active_loans_batch(chain, pawn, nft, lender, active_loans):
+    assert all(pawn.stateOf(loan.pawn_id) == 2 for loan in active_loans)
+    active_count = pawn.activePawnCount()
+    chain.pending_timestamp += max(loan.duration for loan in active_loans)
+
+    tx = pawn.claimDefaultedBatch([loan.pawn_id for loan in active_loans], sender=lender)
+    assert len(list(tx.decode_logs(pawn.PawnDefaultClaimed))) == len(active_loans)
+    assert pawn.activePawnCount() == active_count - len(active_loans)
+    for loan in active_loans:
+        assert nft.ownerOf(loan.nft_id) == lender.address
+
+def test_repay_active_loans_batch(chain, pawn, nft, token, owner, borrower, lender, TokenPermit, active_loans):
+    assert all(pawn.stateOf(loan.pawn_id) == 2 for loan in active_loans)
+    total = sum(loan.amount + loan.interest for loan in active_loans)
+    token.transfer(borrower, total, sender=owner)
+    lender_balance = token.balanceOf(lender)
+    deadline = chain.pending_timestamp + 60
+    permit = generateTokenPermitSignature(token, TokenPermit, borrower, pawn, total, deadline)
+
+    tx = pawn.repayBatch([loan.pawn_id for loan in active_loans], deadline, permit, sender=borrower)
+    # one Approval from the permit and a single Transfer to the only lender
+    assert len([log for log in tx.logs if log["address"] == token.address]) == 2
+    assert token.balanceOf(lender) == lender_balance + total
+    for loan in active_loans:
+        assert pawn.stateOf(loan.pawn_id) == 8
+        assert nft.ownerOf(loan.nft_id) == borrower.address
+
+def _refinance_offer(chain, nft, token, lender, loan, amount, interest=2, duration=200):
+    return (lender.address, nft.address, loan.nft_id, token.address, amount, interest, duration, 0, chain.pending_timestamp + 60)
+
+def test_refinance_active_loan(accounts, chain, pawn, nft, token, owner, borrower, lender, LendOffer, loan_active):
+    new_lender = accounts[3]
+    amount = 150
+    token.transfer(new_lender, amount, sender=owner)
+    token.approve(pawn, amount, sender=new_lender)
+    offer = _refinance_offer(chain, nft, token, new_lender, loan_active, amount)
+    offer_signature = generateLendOfferSignature(LendOffer, new_lender, offer)
+    lender_balance = token.balanceOf(lender)
+    borrower_balance = token.balanceOf(borrower)
+    due = loan_active.amount + loan_active.interest
+    active_count = pawn.activePawnCount()
+
+    tx = pawn.refinance(loan_active.pawn_id, offer, offer_signature, 0, b"", 0, b"", sender=borrower)
+    logs = list(tx.decode_logs(pawn.PawnRefinanced))
+    assert len(logs) == 1
+    assert logs[0].oldLender == lender.address
+    assert logs[0].newLender == new_lender.address
+
+    data = pawn.idToData(loan_active.pawn_id)
+    assert data.state == 2
+    assert data.lender == new_lender.address
+    assert data.terms.principal == amount
+    assert data.terms.interest == 2
+    assert data.terms.durationInSeconds == 200
+    assert data.startTimestamp == chain.blocks[tx.block_number].timestamp
+    assert nft.ownerOf(loan_active.nft_id) == pawn.address
+    assert token.balanceOf(lender) == lender_balance + due
+    assert token.balanceOf(borrower) == borrower_balance + amount - due
+    assert token.balanceOf(new_lender) == 0
+    assert pawn.activePawnCount() == active_count
+    assert pawn.lenderPawnByIndex(new_lender, pawn.lenderPawnCount(new_lender) - 1) == loan_active.pawn_id
+
+def test_refinance_with_shortfall(accounts, chain, pawn, nft, token, owner, borrower, lender, LendOffer, loan_active):
+    new_lender = accounts[3]
+    amount = 50
+    token.transfer(new_lender, amount, sender=owner)
+    token.approve(pawn, amount, sender=new_lender)
+    due = loan_active.amount + loan_active.interest
+    token.approve(pawn, due - amount, sender=borrower)
+    offer = _refinance_offer(chain, nft, token, new_lender, loan_active, amount)
+    offer_signature = generateLendOfferSignature(LendOffer, new_lender, offer)
+    lender_balance = token.balanceOf(lender)
+    borrower_balance = token.balanceOf(borrower)
+
+    pawn.refinance(loan_active.pawn_id, offer, offer_signature, 0, b"", 0, b"", sender=borrower)
+    assert token.balanceOf(lender) == lender_balance + due
+    assert token.balanceOf(borrower) == borrower_balance - (due - amount)
+    assert pawn.idToData(loan_active.pawn_id).terms.principal == amount
+
+def test_refinance_same_lender(chain, pawn, nft, token, owner, borrower, lender, LendOffer, loan_active):
+    token.transfer(lender, 150, sender=owner)
+    token.approve(pawn, 150, sender=lender)
+    offer = _refinance_offer(chain, nft, token, lender, loan_active, 150)
+    offer_signature = generateLendOfferSignature(LendOffer, lender, offer)
+    lender_count = pawn.lenderPawnCount(lender)
+
+    pawn.refinance(loan_active.pawn_id, offer, offer_signature, 0, b"", 0, b"", sender=borrower)
+    assert pawn.idToData(loan_active.pawn_id).lender == lender.address
+    # the pawn is not listed a second time for the same lender
+    assert pawn.lenderPawnCount(lender) == lender_count
+
+def test_refinance_not_borrower(accounts, chain, pawn, nft, token, owner, lender, LendOffer, loan_active):
+    new_lender = accounts[3]
+    token.transfer(new_lender, 150, sender=owner)
+    token.approve(pawn, 150, sender=new_lender)
+    offer = _refinance_offer(chain, nft, token, new_lender, loan_active, 150)
+    offer_signature = generateLendOfferSignature(LendOffer, new_lender, offer)
+
+    with ape.reverts():
+        pawn.refinance(loan_active.pawn_id, offer, offer_signature, 0, b"", 0, b"", sender=lender)
+
+def test_refinance_after_expiry(accounts, chain, pawn, nft, token, owner, borrower, LendOffer, loan_active):
+    new_lender = accounts[3]
+    token.transfer(new_lender, 150, sender=owner)
+    token.approve(pawn, 150, sender=new_lender)
+    chain.pending_timestamp += loan_active.duration
+    offer = _refinance_offer(chain, nft, token, new_lender, loan_active, 150)
+    offer_signature = generateLendOfferSignature(LendOffer, new_lender, offer)
+
+    with ape.reverts():
+        pawn.refinance(loan_active.pawn_id, offer, offer_signature, 0, b"", 0, b"", sender=borrower)
@@ -0,0 +1,185 @@
+"""
+Stateful fuzzing of the pawn state machine.
+
+Hypothesis drives random interleavings of create, accept, repay, claim and
+cancel across several borrowers, lenders and NFTs, with random jumps in
+block time, and checks after every step that the contract agrees with a
+simple model of each pawn. Gas used by every operation is recorded in the
+session gas report and summarized at the end.
+"""
+import statistics
+
+from ape.exceptions import ContractLogicError
+from hypothesis import settings, strategies as st
+from hypothesis.stateful import RuleBasedStateMachine, invariant, precondition, rule, run_state_machine_as_test
+
+from .utils import mint_nft, generateNftPermitSignature, generateTokenPermitSignature
+
+CREATED = 1
+ACTIVE = 2
+DEFAULTED = 4
+REPAID = 8
+CANCELED = 0
+
+FUNDING = 10 ** 12
+
+
+def test_pawn_state_machine(accounts, chain, pawn, nft, token, owner, NFTPermit, TokenPermit, gas_report):
+    borrowers = [accounts[1], accounts[3], accounts[4]]
+    lenders = [accounts[2], accounts[5], accounts[6]]
+    participants = borrowers + lenders
+
+    class PawnStateMachine(RuleBasedStateMachine):
+        def __init__(self):
+            super().__init__()
+            self.snapshot = chain.snapshot()
+            token.mintBatch(participants, [FUNDING] * len(participants), sender=owner)
+            self.token_total = sum(token.balanceOf(account) for account in participants)
+            self.last_pawn_id = pawn.nextPawnId()
+            # pawns left active by other tests are not part of the model
+            self.active_start = pawn.activePawnCount()
+            # pawnId => model of the pawn
+            self.pawns = {}
+
+        def teardown(self):
+            chain.restore(self.snapshot)
+
+        def ids_in(self, state):
+            return sorted(pawn_id for pawn_id, model in self.pawns.items() if model["state"] == state)
+
+        def transact(self, operation, call, expected):
+            """
+            Run `call` and check it succeeds exactly when `expected` is true.
+            `expected` of None means the outcome cannot be predicted, e.g. the
+            pawn expires at the block the transaction lands in.
+            """
+            try:
+                tx = call()
+            except ContractLogicError:
+                assert expected is not True, f"{operation} reverted"
+                return None
+            assert expected is not False, f"{operation} should have reverted"
+            gas_report.record(f"stateful.{operation}", tx.gas_used)
+            return tx
+
+        def outcome(self, model, before_expiry):
+            now = chain.pending_timestamp
+            expiry = model["start"] + model["duration"]
+            if abs(now - expiry) <= 1:
+                return None
+            return (now < expiry) == before_expiry
+
+        @rule(
+            borrower=st.sampled_from(borrowers),
+            amount=st.integers(1, 10 ** 6),
+            interest=st.integers(0, 10 ** 4),
+            duration=st.integers(1, 10 ** 4),
+        )
+        def create(self, borrower, amount, interest, duration):
+            nft_id = mint_nft(nft, owner, borrower)
+            deadline = chain.pending_timestamp + 60
+            permit = generateNftPermitSignature(nft, NFTPermit, borrower, pawn, nft_id, deadline)
+            terms = (nft.address, nft_id, token.address, amount, interest, duration)
+            tx = self.transact("create", lambda: pawn.createTermsWithCollateral(terms, deadline, permit, sender=borrower), True)
+            pawn_id = list(tx.decode_logs(pawn.PawnCreated))[0].pawnId
+            assert pawn_id not in self.pawns
+            self.pawns[pawn_id] = {
+                "state": CREATED,
+                "nft_id": nft_id,
+                "borrower": borrower,
+                "lender": None,
+                "amount": amount,
+                "interest": interest,
+                "duration": duration,
+                "start": 0,
+            }
+
+        @precondition(lambda self: self.ids_in(CREATED))
+        @rule(data=st.data(), lender=st.sampled_from(lenders))
+        def accept(self, data, lender):
+            pawn_id = data.draw(st.sampled_from(self.ids_in(CREATED)))
+            model = self.pawns[pawn_id]
+            deadline = chain.pending_timestamp + 60
+            permit = generateTokenPermitSignature(token, TokenPermit, lender, pawn, model["amount"], deadline)
+            tx = self.transact("accept", lambda: pawn.acceptTermsAndFund(pawn_id, deadline, permit, sender=lender), True)
+            model.update(state=ACTIVE, lender=lender, start=chain.blocks[tx.block_number].timestamp)
+
+        @precondition(lambda self: self.ids_in(CREATED))
+        @rule(data=st.data())
+        def cancel(self, data):
+            pawn_id = data.draw(st.sampled_from(self.ids_in(CREATED)))
+            model = self.pawns[pawn_id]
+            self.transact("cancel", lambda: pawn.cancelTerms(pawn_id, sender=model["borrower"]), True)
+            model["state"] = CANCELED
+
+        @precondition(lambda self: self.ids_in(ACTIVE))
+        @rule(data=st.data())
+        def repay(self, data):
+            pawn_id = data.draw(st.sampled_from(self.ids_in(ACTIVE)))
+            model = self.pawns[pawn_id]
+            due = model["amount"] + model["interest"]
+            deadline = chain.pending_timestamp + 60
+            permit = generateTokenPermitSignature(token, TokenPermit, model["borrower"], pawn, due, deadline)
+            expected = self.outcome(model, before_expiry=True)
+            if self.transact("repay", lambda: pawn.repay(pawn_id, deadline, permit, sender=model["borrower"]), expected):
+                model["state"] = REPAID
+
+        @precondition(lambda self: self.ids_in(ACTIVE))
+        @rule(data=st.data())
+        def claim(self, data):
+            pawn_id = data.draw(st.sampled_from(self.ids_in(ACTIVE)))
+            model = self.pawns[pawn_id]
+            expected = self.outcome(model, before_expiry=False)
+            if self.transact("claim", lambda: pawn.claimDefaulted(pawn_id, sender=model["lender"]), expected):
+                model["state"] = DEFAULTED
+
+        @rule(seconds=st.integers(1, 10 ** 4))
+        def wait(self, seconds):
+            chain.pending_timestamp += seconds
+
+        @invariant()
+        def pawn_states_match_model(self):
+            for pawn_id, model in self.pawns.items():
+                # canceled records are cleared from storage
+                if model["state"] != CANCELED:
+                    assert pawn.idToData(pawn_id).state == model["state"]
+
+        @invariant()
+        def nft_custody(self):
+            for model in self.pawns.values():
+                holder = nft.ownerOf(model["nft_id"])
+                if model["state"] in (CREATED, ACTIVE):
+                    assert holder == pawn.address
+                elif model["state"] == DEFAULTED:
+                    assert holder == model["lender"].address
+                else:
+                    assert holder == model["borrower"].address
+
+        @invariant()
+        def tokens_conserved(self):
+            assert token.balanceOf(pawn) == 0
+            assert sum(token.balanceOf(account) for account in participants) == self.token_total
+
+        @invariant()
+        def next_pawn_id_monotonic(self):
+            next_pawn_id = pawn.nextPawnId()
+            assert next_pawn_id >= self.last_pawn_id
+            assert all(pawn_id < next_pawn_id for pawn_id in self.pawns)
+            self.last_pawn_id = next_pawn_id
+
+        @invariant()
+        def active_set_matches_model(self):
+            active = self.ids_in(ACTIVE)
+            assert pawn.activePawnCount() - self.active_start == len(active)
+
+    run_state_machine_as_test(
+        PawnStateMachine,
+        settings=settings(max_examples=20, stateful_step_count=30, deadline=None),
+    )
+
+    for operation, samples in sorted(gas_report.samples.items()):
+        if operation.startswith("stateful."):
+            print(
+                f"{operation}: n={len(samples)} min={min(samples)} "
+                f"median={statistics.median(samples):.0f} max={max(samples)}"
+            )
@@ -240,3 +240,52 @@ def test_permit(chain, token, owner, receiver, TokenPermit):
     token.permit(owner, receiver, amount, deadline, signature, sender=receiver)
 
     assert token.allowance(owner, receiver) == 100
+
+
+def test_transfer_batch(token, owner, accounts):
+    """
+    transferBatch must credit every receiver, debit the sender once for the
+    total and emit one Transfer per receiver.
+    """
+    receivers = [accounts[1], accounts[2], accounts[3]]
+    amounts = [100, 200, 300]
+    owner_balance = token.balanceOf(owner)
+
+    tx = token.transferBatch(receivers, amounts, sender=owner)
+
+    logs = list(tx.decode_logs(token.Transfer))
+    assert len(logs) == 3
+    assert [log.receiver for log in logs] == receivers
+    assert [log.amount for log in logs] == amounts
+    for receiver, amount in zip(receivers, amounts):
+        assert token.balanceOf(receiver) == amount
+    assert token.balanceOf(owner) == owner_balance - sum(amounts)
+
+    # Expected insufficient funds failure
+    with ape.reverts():
+        token.transferBatch([owner], [1000], sender=accounts[1])
+
+    # Expected length mismatch failure
+    with ape.reverts():
+        token.transferBatch(receivers, [1, 2], sender=owner)
+
+
+def test_mint_batch(token, owner, accounts):
+    """
+    mintBatch must credit every receiver and raise the total supply once.
+    """
+    totalSupply = token.totalSupply()
+    receivers = [accounts[1], accounts[2]]
+
+    tx = token.mintBatch(receivers, [420, 69], sender=owner)
+
+    logs = list(tx.decode_logs(token.Transfer))
+    assert len(logs) == 2
+    assert logs[0].sender == ZERO_ADDRESS
+    assert token.balanceOf(accounts[1]) == 420
+    assert token.balanceOf(accounts[2]) == 69
+    assert token.totalSupply() == totalSupply + 489
+
+    # Expected insufficient permission failure
+    with ape.reverts():
+        token.mintBatch(receivers, [1, 1], sender=accounts[1])
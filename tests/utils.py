@@ -0,0 +1,53 @@
+from collections import namedtuple
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+Loan = namedtuple("Loan", ["pawn_id", "nft_id", "amount", "interest", "duration"])
+
+def mint_nft(nft, owner, receiver):
+    tx = nft.mint(receiver, sender=owner)
+    logs = list(tx.decode_logs(nft.Transfer))
+    assert len(logs) == 1
+    assert logs[0].receiver == receiver
+    nft_id = logs[0].tokenId
+    assert nft.ownerOf(nft_id) == receiver.address
+    assert nft.idToApprovals(nft_id) == ZERO_ADDRESS
+    return nft_id
+
+def generateNftPermitSignature(nft, Permit, owner, approved, nft_id, deadline):
+    nonce = nft.nonces(nft_id)
+    permit = Permit(approved.address, nft_id, nonce, deadline)
+    return owner.sign_message(permit.signable_message).encode_rsv()
+
+def generateTokenPermitSignature(token, Permit, owner, approved, amount, deadline):
+    nonce = token.nonces(owner)
+    permit = Permit(owner.address, approved.address, amount, nonce, deadline)
+    return owner.sign_message(permit.signable_message).encode_rsv()
+
+def generateLendOfferSignature(LendOffer, lender, offer):
+    return lender.sign_message(LendOffer(*offer).signable_message).encode_rsv()
+
+def create_pawn(chain, pawn, nft, token, owner, borrower, Permit, amount=100, interest=1, duration=10):
+    nft_id = mint_nft(nft, owner, borrower)
+    deadline = chain.pending_timestamp + 60
+    permit = generateNftPermitSignature(nft, Permit, borrower, pawn, nft_id, deadline)
+    terms = (nft.address, nft_id, token.address, amount, interest, duration)
+    tx = pawn.createTermsWithCollateral(terms, deadline, permit, sender=borrower)
+    logs = list(tx.decode_logs(pawn.PawnCreated))
+    assert len(logs) == 1
+    return tx, logs[0].pawnId
+
+def fund_pawn(chain, pawn, token, owner, lender, Permit, pawn_id):
+    principal = pawn.idToData(pawn_id).terms.principal
+    token.transfer(lender, principal, sender=owner)
+    deadline = chain.pending_timestamp + 60
+    permit = generateTokenPermitSignature(token, Permit, lender, pawn, principal, deadline)
+    return pawn.acceptTermsAndFund(pawn_id, deadline, permit, sender=lender)
+
+def repay_pawn(chain, pawn, token, owner, borrower, Permit, pawn_id):
+    data = pawn.idToData(pawn_id)
+    due = data.terms.principal + data.terms.interest
+    token.transfer(borrower, due, sender=owner)
+    deadline = chain.pending_timestamp + 60
+    permit = generateTokenPermitSignature(token, Permit, borrower, pawn, due, deadline)
+    return pawn.repay(pawn_id, deadline, permit, sender=borrower)